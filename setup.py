@@ -36,4 +36,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     zip_safe=False,
+    extras_require={
+        'jinja2': ['Jinja2'],
+    },
 )
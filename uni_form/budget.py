@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+    Render budgets, limiting the time and output size a single render of the
+    `{% uni_form %}` tag can take. Once a render runs out of its budget, the fields
+    left are rendered plainly, without going through templates, and formsets with a
+    `formset_window_url` stop rendering forms, leaving the rest to be loaded like
+    the windows of the `formset_window_size` helper attribute.
+
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+_local = threading.local()
+
+
+class RenderBudget(object):
+    """
+    The time in `seconds` and html `size` in bytes a render can take. None means no limit.
+    """
+    def __init__(self, seconds=None, size=None, name=''):
+        self.seconds = seconds
+        self.size = size
+        self.name = name
+        self.output = 0
+        self.exceeded = False
+        self.start_time = time.time()
+
+    def add(self, html):
+        self.output += len(html)
+
+    def is_exceeded(self):
+        """
+        Tells if the render has run out of its budget, logging a warning the first time.
+        """
+        if not self.exceeded:
+            elapsed = time.time() - self.start_time
+            if (self.seconds is not None and elapsed > self.seconds) or \
+                    (self.size is not None and self.output > self.size):
+                self.exceeded = True
+                logging.warning("Render of %s exceeded its budget after %.1fms and %d bytes, rendering the rest plainly"
+                    % (self.name, elapsed * 1000, self.output))
+        return self.exceeded
+
+
+def get_budget(form, helper=None):
+    """
+    Returns the `RenderBudget` for rendering `form` with `helper`, from its
+    `render_budget` and `render_budget_size` attributes or else from the
+    `UNIFORM_RENDER_BUDGET` and `UNIFORM_RENDER_BUDGET_SIZE` settings, or None if
+    there are no limits.
+    """
+    seconds = getattr(helper, 'render_budget', None)
+    if seconds is None:
+        seconds = getattr(settings, 'UNIFORM_RENDER_BUDGET', None)
+    size = getattr(helper, 'render_budget_size', None)
+    if size is None:
+        size = getattr(settings, 'UNIFORM_RENDER_BUDGET_SIZE', None)
+
+    if seconds is None and size is None:
+        return None
+    return RenderBudget(seconds, size, form.__class__.__name__)
+
+
+def activate(budget):
+    """
+    Sets the budget of the render starting in this thread. Returns the one it replaces,
+    to hand to `deactivate` once the render ends, as renders can be nested.
+    """
+    previous = get_active()
+    _local.budget = budget
+    return previous
+
+
+def deactivate(previous=None):
+    _local.budget = previous
+
+
+def get_active():
+    """
+    Returns the budget of the render in progress in this thread, if any.
+    """
+    return getattr(_local, 'budget', None)
+
+
+def render_plain_field(bound_field):
+    """
+    Renders a field with its label, errors and widget, without going through templates.
+    """
+    if bound_field.is_hidden:
+        return unicode(bound_field)
+
+    errors = u''.join([u'<p class="errorField">%s</p>' % conditional_escape(error) for error in bound_field.errors])
+    return mark_safe(u'<div id="div_%s" class="ctrlHolder%s">%s%s%s</div>' % (bound_field.auto_id,
+        bound_field.errors and u' error' or u'', errors, bound_field.label_tag(), bound_field))
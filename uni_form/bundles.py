@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+    Builds minified and content hashed bundles of the uni-form static files, so
+    `{% uni_form_setup bundled %}` loads them in two requests, with urls that can
+    be cached forever.
+
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.utils import simplejson
+
+THEMES = ('default', 'blue', 'dark')
+MANIFEST_NAME = 'manifest.json'
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+
+_manifests = {}
+_inline_css = {}
+
+
+def get_bundle_root():
+    bundle_root = getattr(settings, 'UNIFORM_BUNDLE_ROOT', None)
+    if bundle_root is None and settings.STATIC_ROOT:
+        bundle_root = os.path.join(settings.STATIC_ROOT, 'uni_form', 'bundles')
+    return bundle_root
+
+
+def get_bundle_url():
+    return getattr(settings, 'UNIFORM_BUNDLE_URL', '%suni_form/bundles/' % (settings.STATIC_URL or ''))
+
+
+def find_static(path):
+    """
+    Returns the absolute path of a static file, looking first through staticfiles
+    finders, so projects overriding uni-form's files get theirs bundled.
+    """
+    try:
+        from django.contrib.staticfiles import finders
+        found = finders.find(path)
+    except ImportError:
+        found = None
+
+    return found or os.path.join(STATIC_DIR, path)
+
+
+def read_static(path):
+    static_file = open(find_static(path))
+    try:
+        return static_file.read()
+    finally:
+        static_file.close()
+
+
+def minify_css(source):
+    source = re.sub(r'(?s)/\*.*?\*/', '', source)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r' ?([{};,>]) ?', r'\1', source)
+    source = source.replace(': ', ':').replace(';}', '}')
+    return source.strip()
+
+
+def minify_js(source):
+    """
+    Conservative javascript minification: only removes comments starting a line,
+    indentation and blank lines, which is safe whatever the code does.
+    """
+    source = re.sub(r'(?ms)^\s*/\*.*?\*/', '', source)
+    lines = [line.strip() for line in source.splitlines()]
+    return '\n'.join([line for line in lines if line and not line.startswith('//')])
+
+
+def write_bundle(output_dir, name, extension, content):
+    filename = '%s.%s.%s' % (name, hashlib.md5(content).hexdigest()[:12], extension)
+    bundle = open(os.path.join(output_dir, filename), 'w')
+    try:
+        bundle.write(content)
+    finally:
+        bundle.close()
+    return filename
+
+
+def build_bundles(output_dir=None, themes=THEMES, include_jquery=False):
+    """
+    Writes a css bundle for every theme in `themes`, a javascript bundle, another one
+    starting with jQuery if `include_jquery`, and a manifest mapping them to their 
+    content hashed filenames into `output_dir`, which defaults to the 
+    `UNIFORM_BUNDLE_ROOT` setting. Returns the manifest.
+    """
+    output_dir = output_dir or get_bundle_root()
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    manifest = {'css': {}}
+    base_css = minify_css(read_static('uni_form/uni-form.css'))
+    for theme in themes:
+        theme_css = minify_css(read_static('uni_form/%s.uni-form.css' % theme))
+        manifest['css'][theme] = write_bundle(output_dir, 'uni-form.%s' % theme, 'css',
+            base_css + '\n' + theme_css)
+
+    js = minify_js(read_static('uni_form/uni-form.jquery.js'))
+    manifest['js'] = write_bundle(output_dir, 'uni-form', 'js', js)
+    if include_jquery:
+        js = minify_js(read_static('uni_form/jquery.js')) + ';\n' + js
+        manifest['js_jquery'] = write_bundle(output_dir, 'uni-form.jquery', 'js', js)
+
+    manifest_file = open(os.path.join(output_dir, MANIFEST_NAME), 'w')
+    try:
+        manifest_file.write(simplejson.dumps(manifest))
+    finally:
+        manifest_file.close()
+
+    _manifests.pop(output_dir, None)
+    return manifest
+
+
+def get_bundle(theme='default'):
+    """
+    Returns a dictionary with the `css`, `js` and, if built, `js_jquery` urls of the 
+    bundles for `theme`, or None if they haven't been built. The manifest is read 
+    only once.
+    """
+    bundle_root = get_bundle_root()
+    if bundle_root is None:
+        return None
+
+    if bundle_root not in _manifests:
+        try:
+            manifest_file = open(os.path.join(bundle_root, MANIFEST_NAME))
+        except IOError:
+            return None
+        try:
+            _manifests[bundle_root] = simplejson.loads(manifest_file.read())
+        finally:
+            manifest_file.close()
+
+    manifest = _manifests[bundle_root]
+    if theme not in manifest['css']:
+        return None
+
+    bundle_url = get_bundle_url()
+    bundle = {
+        'css': bundle_url + manifest['css'][theme],
+        'js': bundle_url + manifest['js'],
+    }
+    if 'js_jquery' in manifest:
+        bundle['js_jquery'] = bundle_url + manifest['js_jquery']
+    return bundle
+
+
+def get_inline_css(theme='default'):
+    """
+    Returns the minified css of `theme`, for inlining it in a <style> tag.
+    """
+    if theme not in _inline_css:
+        _inline_css[theme] = minify_css(read_static('uni_form/uni-form.css')) + '\n' + \
+            minify_css(read_static('uni_form/%s.uni-form.css' % theme))
+    return _inline_css[theme]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+    In process caches used by uni_form for things that are expensive to render.
+
+"""
+import threading
+
+
+class LRUCache(object):
+    """
+    A dictionary like cache holding at most `max_size` entries. When full, the least
+    recently used quarter of its entries is dropped.
+    """
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.data = {}
+        self.tick = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        try:
+            entry = self.data[key]
+        except KeyError:
+            return default
+
+        self.tick += 1
+        entry[1] = self.tick
+        return entry[0]
+
+    def set(self, key, value):
+        self.lock.acquire()
+        try:
+            self.tick += 1
+            self.data[key] = [value, self.tick]
+            if len(self.data) > self.max_size:
+                entries = sorted(self.data.items(), key=lambda item: item[1][1])
+                for old_key, entry in entries[:len(entries) - self.max_size * 3 / 4]:
+                    del self.data[old_key]
+        finally:
+            self.lock.release()
+
+    def delete_matching(self, test):
+        """
+        Deletes the entries whose key passes `test`.
+        """
+        self.lock.acquire()
+        try:
+            for key in [key for key in self.data.keys() if test(key)]:
+                del self.data[key]
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.data.clear()
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+    Compilation of the uni_form templates, the ones overridden by the project
+    included, into Python functions. Their text, variables, filters, `if`,
+    `ifequal`, `for`, `with`, `include` and `csrf_token` tags are turned into
+    Python code rendering them without going through the nodes of the template
+    engine nor pushing and popping contexts. Templates using other tags are left
+    to the template engine.
+
+    `uni_form.renderers.CompiledRenderer` renders with the compiled functions.
+
+"""
+from django.conf import settings
+from django.template import Context, TextNode, VariableNode, VariableDoesNotExist
+# loader_tags can only be imported once the template loader, which registers it, is
+from django.template import loader as template_loader
+from django.template.defaulttags import CommentNode, CsrfTokenNode, ForNode, IfEqualNode, IfNode, LoadNode, WithNode
+from django.template.loader_tags import ConstantIncludeNode, IncludeNode
+from django.utils.encoding import force_unicode
+from django.utils.formats import localize
+from django.utils.html import escape
+from django.utils.safestring import EscapeData, SafeData, mark_safe
+
+from uni_form import loader, translation
+
+_functions = {}
+
+
+class CompilationError(Exception):
+    """
+    Raised compiling a template using tags the compiler doesn't support.
+    """
+    pass
+
+
+class RenderContext(dict):
+    """
+    The context compiled templates render with: a dictionary that the variables,
+    filters and tags of the template engine can resolve against like a `Context`.
+    """
+    autoescape = True
+    use_l10n = None
+
+    def push(self, values=None):
+        context = RenderContext(self)
+        if values:
+            context.update(values)
+        return context
+
+
+def make_context(context):
+    """
+    Returns a `RenderContext` with the values of `context`, a `Context` or a dictionary.
+    """
+    values = RenderContext()
+    for dictionary in getattr(context, 'dicts', [context]):
+        values.update(dictionary)
+    return values
+
+
+# Variables outputting the texts whose lazy translations are resolved through the
+# cache of `uni_form.translation`
+TEXT_VARIABLES = ('label', 'help_text', 'legend', 'form_error_title', 'formset_error_title')
+
+
+def is_text_variable(expression):
+    lookups = getattr(expression.var, 'lookups', None)
+    return bool(lookups) and lookups[-1] in TEXT_VARIABLES
+
+
+def render_value(value):
+    """
+    Turns a value into a string the way variables are output by the template engine.
+    """
+    value = force_unicode(localize(value))
+    if not isinstance(value, SafeData) or isinstance(value, EscapeData):
+        return escape(value)
+    return value
+
+
+def resolve_variable(expression, context):
+    try:
+        return render_value(expression.resolve(context))
+    except UnicodeDecodeError:
+        return u''
+
+
+def resolve_text(expression, context):
+    try:
+        return render_value(translation.resolve(expression.resolve(context)))
+    except UnicodeDecodeError:
+        return u''
+
+
+def eval_condition(condition, context):
+    try:
+        return condition.eval(context)
+    except VariableDoesNotExist:
+        return None
+
+
+def resolve_sequence(expression, context):
+    try:
+        values = expression.resolve(context, True)
+    except VariableDoesNotExist:
+        values = []
+    if values is None:
+        values = []
+    if not hasattr(values, '__len__'):
+        values = list(values)
+    return values
+
+
+def unpack(context, loopvars, item):
+    try:
+        return context.push(dict(zip(loopvars, item)))
+    except TypeError:
+        return context
+
+
+def include_context(context, extra_context, isolated):
+    values = dict([(name, value.resolve(context)) for name, value in extra_context.iteritems()])
+    if isolated:
+        return RenderContext(values)
+    return context.push(values)
+
+
+def include(template_name, context):
+    """
+    Renders the included `template_name`, with its compiled function if it has one.
+    """
+    function = get_function(template_name)
+    if function is not None:
+        return function(context)
+
+    return loader.get_template(template_name).render(Context(context))
+
+
+def include_dynamic(expression, context, extra_context=None, isolated=False):
+    """
+    Renders the template named by `expression`, outputting nothing on errors unless
+    `TEMPLATE_DEBUG` is on, like `IncludeNode` does, the ones resolving its `with`
+    values included.
+    """
+    try:
+        if extra_context or isolated:
+            context = include_context(context, extra_context or {}, isolated)
+        return include(expression.resolve(context), context)
+    except:
+        if settings.TEMPLATE_DEBUG:
+            raise
+        return u''
+
+
+class Compiler(object):
+    """
+    Generates the Python source of a function rendering a template, given its nodes.
+    Objects the code needs, like texts and variables, are kept in `constants`.
+    """
+    def __init__(self):
+        self.constants = []
+        self.lines = []
+        self.depth = 0
+
+    def constant(self, value):
+        self.constants.append(value)
+        return 'K[%d]' % (len(self.constants) - 1)
+
+    def write(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def compile(self, nodelist, name='<uni_form>'):
+        """
+        Returns the function rendering `nodelist`, which takes a `RenderContext`.
+        Raises `CompilationError` if a node isn't supported.
+        """
+        self.write(0, 'def render(c):')
+        self.write(1, '_o = []')
+        self.write(1, '_a = _o.append')
+        self.compile_nodes(nodelist, 1)
+        self.write(1, "return _mark_safe(u''.join(_o))")
+
+        namespace = {
+            'K': self.constants,
+            '_mark_safe': mark_safe,
+            '_resolve_variable': resolve_variable,
+            '_resolve_text': resolve_text,
+            '_eval_condition': eval_condition,
+            '_resolve_sequence': resolve_sequence,
+            '_unpack': unpack,
+            '_include': include,
+            '_include_dynamic': include_dynamic,
+            '_include_context': include_context,
+        }
+        code = compile('\n'.join(self.lines) + '\n', name, 'exec')
+        exec code in namespace
+        return namespace['render']
+
+    def compile_nodes(self, nodelist, indent):
+        texts = []
+        for node in nodelist:
+            if isinstance(node, TextNode):
+                texts.append(node.s)
+                continue
+            if texts:
+                self.write(indent, '_a(%s)' % self.constant(u''.join(texts)))
+                texts = []
+            self.compile_node(node, indent)
+        if texts:
+            self.write(indent, '_a(%s)' % self.constant(u''.join(texts)))
+        # Python blocks can't be empty
+        self.write(indent, 'pass')
+
+    def compile_node(self, node, indent):
+        if isinstance(node, (LoadNode, CommentNode)):
+            return
+
+        elif isinstance(node, VariableNode):
+            function = is_text_variable(node.filter_expression) and '_resolve_text' or '_resolve_variable'
+            self.write(indent, '_a(%s(%s, c))' % (function, self.constant(node.filter_expression)))
+
+        elif isinstance(node, IfNode):
+            self.write(indent, 'if _eval_condition(%s, c):' % self.constant(node.var))
+            self.compile_nodes(node.nodelist_true, indent + 1)
+            if node.nodelist_false:
+                self.write(indent, 'else:')
+                self.compile_nodes(node.nodelist_false, indent + 1)
+
+        elif isinstance(node, IfEqualNode):
+            self.write(indent, 'if (%s.resolve(c, True) %s %s.resolve(c, True)):' % (self.constant(node.var1),
+                node.negate and '!=' or '==', self.constant(node.var2)))
+            self.compile_nodes(node.nodelist_true, indent + 1)
+            if node.nodelist_false:
+                self.write(indent, 'else:')
+                self.compile_nodes(node.nodelist_false, indent + 1)
+
+        elif isinstance(node, ForNode):
+            self.compile_for(node, indent)
+
+        elif isinstance(node, WithNode):
+            self.depth += 1
+            outer = '_c%d' % self.depth
+            self.write(indent, '%s = c' % outer)
+            self.write(indent, 'c = %s.push(dict([(name, value.resolve(%s)) for name, value in %s.iteritems()]))' % (
+                outer, outer, self.constant(node.extra_context)))
+            self.compile_nodes(node.nodelist, indent)
+            self.write(indent, 'c = %s' % outer)
+            self.depth -= 1
+
+        elif isinstance(node, IncludeNode):
+            self.write(indent, '_a(_include_dynamic(%s, c, %s, %s))' % (self.constant(node.template_name),
+                self.constant(node.extra_context), node.isolated_context))
+
+        elif isinstance(node, ConstantIncludeNode):
+            context = 'c'
+            if node.extra_context or node.isolated_context:
+                context = '_include_context(c, %s, %s)' % (self.constant(node.extra_context), node.isolated_context)
+            if node.template is not None:
+                self.write(indent, '_a(_include(%s, %s))' % (self.constant(node.template.name), context))
+
+        elif isinstance(node, CsrfTokenNode):
+            self.write(indent, '_a(%s.render(c))' % self.constant(node))
+
+        else:
+            raise CompilationError("Can't compile %r" % node)
+
+    def compile_for(self, node, indent):
+        self.depth += 1
+        depth = self.depth
+        self.write(indent, '_c%d = c' % depth)
+        self.write(indent, '_v%d = _resolve_sequence(%s, c)' % (depth, self.constant(node.sequence)))
+        self.write(indent, '_n%d = len(_v%d)' % (depth, depth))
+        self.write(indent, 'if _n%d:' % depth)
+        self.write(indent + 1, '_l%d = c.push()' % depth)
+        self.write(indent + 1, "_f%d = _l%d['forloop'] = {'parentloop': _c%d.get('forloop', {})}" % (depth, depth, depth))
+        if node.is_reversed:
+            self.write(indent + 1, '_v%d = reversed(_v%d)' % (depth, depth))
+        self.write(indent + 1, 'for _i%d, _x%d in enumerate(_v%d):' % (depth, depth, depth))
+        loop = indent + 2
+        self.write(loop, "_f%d['counter0'] = _i%d" % (depth, depth))
+        self.write(loop, "_f%d['counter'] = _i%d + 1" % (depth, depth))
+        self.write(loop, "_f%d['revcounter'] = _n%d - _i%d" % (depth, depth, depth))
+        self.write(loop, "_f%d['revcounter0'] = _n%d - _i%d - 1" % (depth, depth, depth))
+        self.write(loop, "_f%d['first'] = _i%d == 0" % (depth, depth))
+        self.write(loop, "_f%d['last'] = _i%d == _n%d - 1" % (depth, depth, depth))
+        if len(node.loopvars) > 1:
+            self.write(loop, 'c = _unpack(_l%d, %s, _x%d)' % (depth, self.constant(node.loopvars), depth))
+        else:
+            self.write(loop, 'c = _l%d' % depth)
+            self.write(loop, 'c[%s] = _x%d' % (self.constant(node.loopvars[0]), depth))
+        self.compile_nodes(node.nodelist_loop, loop)
+        self.write(indent + 1, 'c = _c%d' % depth)
+        if node.nodelist_empty:
+            self.write(indent, 'else:')
+            self.compile_nodes(node.nodelist_empty, indent + 1)
+        self.depth -= 1
+
+
+def compile_template(template):
+    """
+    Returns the function rendering the Django `template`, or None if it uses tags the
+    compiler doesn't support.
+    """
+    try:
+        return Compiler().compile(template.nodelist, getattr(template, 'name', None) or '<uni_form>')
+    except CompilationError:
+        return None
+
+
+def get_function(template_name):
+    """
+    Returns the compiled function rendering `template_name` with a `RenderContext`,
+    compiled again whenever `uni_form.loader` loads the template again, or None if
+    it can't be compiled.
+    """
+    template = loader.get_template(template_name)
+    try:
+        compiled_template, function = _functions[template_name]
+        if compiled_template is template:
+            return function
+    except KeyError:
+        pass
+
+    function = None
+    if hasattr(template, 'nodelist'):
+        function = compile_template(template)
+    _functions[template_name] = (template, function)
+    return function
+
+
+def compile_templates(template_names=loader.UNIFORM_TEMPLATES):
+    """
+    Compiles `template_names`, by default all the uni_form templates. Returns the
+    names of the ones that can't be compiled.
+    """
+    return [template_name for template_name in template_names if get_function(template_name) is None]
+
+
+def clear_cache():
+    _functions.clear()
@@ -9,10 +9,12 @@ import sys
 from django.conf import settings
 from django.core.urlresolvers import reverse, NoReverseMatch
 from django.forms.forms import BoundField
+from django.forms.formsets import ManagementForm, TOTAL_FORM_COUNT, INITIAL_FORM_COUNT, MAX_NUM_FORM_COUNT
 from django.template import Context, Template
-from django.template.loader import render_to_string
 from django.utils.safestring import mark_safe
 
+from uni_form import budget, renderers, translation
+
 
 class FormHelpersException(Exception):
     """ 
@@ -132,11 +134,115 @@ def render_field(field, form, form_style='', template="uni_form/field.html", lab
         html = ''
     else:
         bound_field = BoundField(form, field_instance, field)
-        html = render_to_string(template, {'field': bound_field, 'labelclass': labelclass})
+        render_budget = budget.get_active()
+        if render_budget is not None and render_budget.is_exceeded():
+            html = budget.render_plain_field(bound_field)
+        else:
+            html = renderers.get_active().render_field(bound_field, template, labelclass)
+        if render_budget is not None:
+            render_budget.add(html)
 
     return html
 
 
+def find_layout_object(fields, name, form_style=''):
+    """
+    Looks recursively in `fields` for a layout object whose `css_id` is `name`, or for 
+    the form field called `name`. Returns a tuple with the object found and the form 
+    style it is rendered with by a full render, or `(None, None)` if nothing matches.
+    """
+    for field in fields:
+        if hasattr(field, 'render'):
+            if name in (getattr(field, 'css_id', None), getattr(field, 'div_id', None)):
+                return field, form_style
+            if hasattr(field, 'fields'):
+                # Nested layout objects are rendered without the form style
+                layout_object, style = find_layout_object(field.fields, name)
+                if layout_object is not None:
+                    return layout_object, style
+        elif field == name:
+            return field, form_style
+
+    return None, None
+
+
+def find_multifields(fields, multifields=None):
+    """
+    Looks recursively in `fields` for `MultiField` objects. Returns a dictionary with 
+    the `MultiField` rendering every form field keyed by the field name.
+    """
+    if multifields is None:
+        multifields = {}
+    for field in fields:
+        if isinstance(field, MultiField):
+            for name in field.fields:
+                multifields[name] = field
+        elif hasattr(field, 'fields'):
+            find_multifields(field.fields, multifields)
+
+    return multifields
+
+
+def render_field_fragments(form, previous_ids=(), template="uni_form/field.html", layout=None):
+    """
+    Renders the fields of a bound `form` whose html may have changed since it was 
+    last displayed: the ones with errors, and the ones whose `div_<auto_id>` id is in 
+    `previous_ids`, usually the ones that had errors before. Returns a dictionary 
+    with the html of every field keyed by its `div_<auto_id>` id.
+
+    Fields of a `MultiField` of `layout` have no element of their own, so its whole 
+    container is rendered instead, keyed by its `css_id`. Returns None if one of them 
+    has no `css_id`, as the fields it renders can't be found in the page then.
+    """
+    multifields = {}
+    if layout is not None:
+        multifields = find_multifields(layout.fields)
+    if [multifield for multifield in multifields.values() if not multifield.div_id]:
+        return None
+
+    fragments = {}
+    renderer = renderers.get_active()
+    for bound_field in form:
+        if bound_field.is_hidden:
+            continue
+
+        multifield = multifields.get(bound_field.name)
+        if multifield is not None:
+            if multifield.div_id not in fragments and (bound_field.errors or multifield.div_id in previous_ids):
+                fragments[multifield.div_id] = multifield.render(form)
+            continue
+
+        div_id = u'div_%s' % bound_field.auto_id
+        if bound_field.errors or div_id in previous_ids:
+            fragments[div_id] = renderer.render_field(bound_field, template)
+
+    return fragments
+
+
+def get_formset_window(formset, start=0, size=None):
+    """
+    Returns a tuple with the `size` forms of `formset` starting at `start`, a management
+    form counting only the forms up to the last of them, which are the ones a page 
+    loading windows one after the other submits, and where the next window starts, or 
+    None if there are no more forms. Bound formsets only hold the forms their page 
+    submitted, so they are never windowed.
+    """
+    forms = formset.forms
+    if size is None or formset.is_bound:
+        return forms, formset.management_form, None
+
+    start = max(0, min(start, len(forms)))
+    stop = min(start + size, len(forms))
+    management_form = ManagementForm(auto_id=formset.auto_id, prefix=formset.prefix, initial={
+        TOTAL_FORM_COUNT: stop,
+        INITIAL_FORM_COUNT: min(formset.initial_form_count(), stop),
+        MAX_NUM_FORM_COUNT: formset.max_num,
+    })
+    if stop == len(forms):
+        stop = None
+    return forms[start:stop], management_form, stop
+
+
 class Layout(object):
     """ 
     Form Layout, add fieldsets, rows, fields and html
@@ -184,7 +290,7 @@ class Fieldset(object):
             html += u' class="%s"' % form_style
         html += '>'
 
-        html += self.legend and (u'<legend>%s</legend>' % self.legend) or ''
+        html += self.legend and (u'<legend>%s</legend>' % translation.resolve(self.legend)) or ''
         for field in self.fields:
             html += render_field(field, form)
         html += u'</fieldset>'
@@ -199,9 +305,13 @@ class MultiField(object):
         self.div_class = kwargs.get('css_class', u'ctrlHolder')
         self.div_id = kwargs.get('css_id', None)
         self.label_class = kwargs.get('label_class', u'blockLabel')
-        self.label_html = label and (u'<p class="label">%s</p>\n' % unicode(label)) or ''
+        self.label = label
         self.fields = fields
 
+    @property
+    def label_html(self):
+        return self.label and (u'<p class="label">%s</p>\n' % translation.resolve(self.label)) or ''
+
     def render(self, form):
         FAIL_SILENTLY = getattr(settings, 'UNIFORM_FAIL_SILENTLY', True)
 
@@ -226,15 +336,17 @@ class MultiField(object):
                 errors += u'<p id="error_%i_%s" class="errorField">%s</p>' % (count, auto_id, error)
                 count += 1
             if bound_field.help_text:
-                helptext += u'<p id="hint_%s" class="formHint">%s</p>' % (auto_id, bound_field.help_text)
+                helptext += u'<p id="hint_%s" class="formHint">%s</p>' % (auto_id,
+                    translation.resolve(bound_field.help_text))
 
+        div_class = self.div_class
         if errors:
-            self.css += u' error'
+            div_class += u' error'
 
         output = u'<div'
         if self.div_id:
             output += u' id="%s"' % self.div_id
-        output += u' class="%s"' % self.div_class
+        output += u' class="%s"' % div_class
         output += '>\n'
         output += errors
         output += self.label_html
@@ -321,6 +433,21 @@ class FormHelper(object):
             Always starts with uniForm even do specify classes.
         
         form_tag: Defaults to True. If set to False it renders the form without the form tags.
+
+        formset_window_size: Defaults to None. If set, formsets only render their first
+            that many forms, and uni-form.jquery.js loads the next ones from
+            `formset_window_url` as the user scrolls.
+
+        render_budget: Defaults to the `UNIFORM_RENDER_BUDGET` setting. Seconds a render
+            can take before the fields left are rendered plainly and formsets stop
+            rendering forms. `render_budget_size` limits the html output in bytes.
+
+        renderer: Defaults to the `UNIFORM_RENDERER` setting. The `uni_form.renderers`
+            strategy forms are rendered with, as a class, an instance or a dotted path.
+
+        formset_empty_form: Defaults to False. If set to True, formsets also render their
+            `empty_form` inside a `<template>` tag, which uni-form.jquery.js clones for
+            adding forms without a round trip to the server.
         
     
     Demonstration:
@@ -354,6 +481,12 @@ class FormHelper(object):
     form_tag = True
     form_error_title = None
     formset_error_title = None
+    formset_empty_form = False
+    formset_window_size = None
+    formset_window_url = ''
+    render_budget = None
+    render_budget_size = None
+    renderer = None
 
     def __init__(self):
         self.inputs = self.inputs[:]
@@ -407,12 +540,49 @@ class FormHelper(object):
     
     def render_layout(self, form, form_style):
         return mark_safe(self.layout.render(form, form_style))
+
+    def render_partial(self, form, name):
+        """
+        Renders only one part of the form: the field called `name`, or the `Fieldset`, 
+        `Row`, `Column` or `MultiField` of the layout whose `css_id` is `name`. The html 
+        is the same the full render outputs for that part.
+        """
+        form_style = self.form_style
+        layout_object = None
+        if self.layout is not None:
+            layout_object, form_style = find_layout_object(self.layout.fields, name, form_style)
+
+        if layout_object is None:
+            if name not in form.fields:
+                raise FormHelpersException("Could not find '%s' in the layout or the form fields" % name)
+            layout_object, form_style = name, self.form_style
+
+        # A partial render must not interfere with the double rendering checks of a full one
+        rendered_fields = getattr(form, 'rendered_fields', None)
+        form.rendered_fields = []
+        try:
+            html = render_field(layout_object, form, form_style)
+        finally:
+            if rendered_fields is None:
+                del form.rendered_fields
+            else:
+                form.rendered_fields = rendered_fields
+
+        return mark_safe(html)
     
     def get_attributes(self):
         items = {}
         items['form_method'] = self.form_method.strip()
         items['form_tag'] = self.form_tag
         items['form_style'] = self.form_style.strip()
+        items['formset_empty_form'] = self.formset_empty_form
+        if self.formset_window_size:
+            items['formset_window_size'] = self.formset_window_size
+        if self.formset_window_url:
+            try:
+                items['formset_window_url'] = reverse(self.formset_window_url)
+            except NoReverseMatch:
+                items['formset_window_url'] = self.formset_window_url
         
         if self.form_action:
             items['form_action'] = self.form_action.strip()
@@ -423,8 +593,8 @@ class FormHelper(object):
         if self.inputs:
             items['inputs'] = self.inputs
         if self.form_error_title:
-            items['form_error_title'] = self.form_error_title.strip()
+            items['form_error_title'] = translation.resolve(self.form_error_title).strip()
         if self.formset_error_title:
-            items['formset_error_title'] = self.formset_error_title.strip()
+            items['formset_error_title'] = translation.resolve(self.formset_error_title).strip()
         return items
 
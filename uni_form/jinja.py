@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+    Jinja2 rendering of uni_form. With the `UNIFORM_TEMPLATE_ENGINE` setting set
+    to `'jinja2'`, uni_form renders forms with the Jinja2 versions of its templates,
+    in `uni_form/jinja2/`, which output the same markup as the Django ones. Projects
+    override them from the directories in the `UNIFORM_JINJA2_DIRS` setting. The
+    `UNIFORM_COMPACT_WHITESPACE` setting compacts them like the Django ones.
+
+    Jinja2 environments of your own get the uni_form filters and the `uni_form`
+    function with `install`::
+
+        from uni_form.jinja import install
+        install(environment)
+
+    and then, in your Jinja2 templates::
+
+        {{ form|as_uni_form }}
+        {{ uni_form(form, helper, csrf_token) }}
+
+"""
+import os
+
+import jinja2
+from django.conf import settings
+from django.template import Context
+from django.template.defaultfilters import slugify, unordered_list
+from django.utils.encoding import force_unicode
+from django.utils.formats import localize
+from django.utils.html import escape
+from django.utils.safestring import SafeData, mark_safe
+
+from uni_form import translation
+from uni_form.loader import compact_whitespace
+from uni_form.templatetags import uni_form_field
+
+JINJA2_DIR = os.path.join(os.path.dirname(__file__), 'jinja2')
+
+_environment = None
+
+
+def finalize(value):
+    """
+    Outputs values the way Django templates do: localized, and escaped by Django
+    unless they are safe, so the markup is the same.
+    """
+    if hasattr(value, '__html__'):
+        return value
+    value = force_unicode(localize(value))
+    if isinstance(value, SafeData):
+        return jinja2.Markup(value)
+    return jinja2.Markup(escape(value))
+
+
+def translated(text):
+    """
+    Resolves the lazy translation of a label, legend, help text or error title
+    through the cache of `uni_form.translation`.
+    """
+    return translation.resolve(text)
+
+
+def as_uni_form(form):
+    from uni_form.templatetags.uni_form_filters import as_uni_form
+    return jinja2.Markup(as_uni_form(form))
+
+
+def as_uni_errors(form):
+    from uni_form.templatetags.uni_form_filters import as_uni_errors
+    return jinja2.Markup(as_uni_errors(form))
+
+
+def as_uni_field(field):
+    from uni_form.templatetags.uni_form_filters import as_uni_field
+    return jinja2.Markup(as_uni_field(field))
+
+
+def with_class(field):
+    return jinja2.Markup(uni_form_field.with_class(field))
+
+
+def uni_form(form, helper=None, csrf_token=None):
+    """
+    Renders `form` like the `{% uni_form %}` tag does.
+    """
+    from uni_form.templatetags.uni_form_tags import UniFormNode
+    context = Context({'form': form, 'helper': helper})
+    if csrf_token is not None:
+        context['csrf_token'] = csrf_token
+    node = UniFormNode('form', helper is not None and 'helper' or None)
+    return jinja2.Markup(node.render(context))
+
+
+FILTERS = {
+    'as_uni_form': as_uni_form,
+    'as_uni_errors': as_uni_errors,
+    'as_uni_field': as_uni_field,
+    'with_class': with_class,
+    'is_checkbox': uni_form_field.is_checkbox,
+    'translated': translated,
+}
+
+
+def install(environment):
+    """
+    Adds the uni_form filters and the `uni_form` function to a Jinja2 `environment`.
+    """
+    environment.filters.update(FILTERS)
+    environment.globals['uni_form'] = uni_form
+
+
+class CompactingLoader(jinja2.FileSystemLoader):
+    """
+    Loads templates without the whitespace that makes no difference to browsers.
+    """
+    def get_source(self, environment, template):
+        source, filename, uptodate = super(CompactingLoader, self).get_source(environment, template)
+        return compact_whitespace(source), filename, uptodate
+
+
+def get_environment():
+    """
+    Returns the Jinja2 environment uni_form renders with, created the first time.
+    """
+    global _environment
+    if _environment is None:
+        dirs = list(getattr(settings, 'UNIFORM_JINJA2_DIRS', ())) + [JINJA2_DIR]
+        loader_class = jinja2.FileSystemLoader
+        if getattr(settings, 'UNIFORM_COMPACT_WHITESPACE', False):
+            loader_class = CompactingLoader
+        environment = jinja2.Environment(loader=loader_class(dirs), autoescape=True,
+            finalize=finalize, auto_reload=settings.DEBUG)
+        install(environment)
+        environment.filters['slugify'] = slugify
+        environment.filters['unordered_list'] = lambda value: unordered_list(value, autoescape=True)
+        _environment = environment
+    return _environment
+
+
+class Template(object):
+    """
+    A Jinja2 template rendered like a Django one, from a `Context` or a dictionary.
+    """
+    def __init__(self, template):
+        self.template = template
+        self.name = template.name
+
+    def render(self, context):
+        if isinstance(context, Context):
+            data = {}
+            for dictionary in context.dicts:
+                data.update(dictionary)
+            context = data
+        return mark_safe(self.template.render(context))
+
+
+def get_template(template_name):
+    return Template(get_environment().get_template(template_name))
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+    Loading of the templates used by uni_form, with Django's template engine or
+    Jinja2. Compiled templates are kept in memory, so every process loads and 
+    compiles them only once. The includes of Django templates are inlined, so
+    rendering them doesn't go through included templates, and their whitespace
+    is compacted with the `UNIFORM_COMPACT_WHITESPACE` setting.
+
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template, TemplateDoesNotExist, TemplateSyntaxError
+from django.template import loader
+from django.template.base import tag_re
+
+from uni_form import profiling
+
+UNIFORM_TEMPLATES = (
+    'uni_form/whole_uni_form.html',
+    'uni_form/whole_uni_formset.html',
+    'uni_form/uni_form.html',
+    'uni_form/uni_formset.html',
+    'uni_form/formset_forms.html',
+    'uni_form/field.html',
+    'uni_form/multifield.html',
+    'uni_form/errors.html',
+    'uni_form/errors_formset.html',
+    'uni_form/betterform.html',
+    'uni_form/includes.html',
+)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Includes of a constant template name, with the variables they set
+INCLUDE_RE = re.compile(r"""{%\s*include\s+(?:"([^"]+)"|'([^']+)')(?:\s+with\s+(.*?))?\s*%}""")
+INHERITANCE_RE = re.compile(r'{%\s*(?:extends|block)\s')
+
+# Elements whose whitespace shows or matters to their content
+PRESERVED_RE = re.compile(r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+
+_templates = {}
+
+
+def load_template(template_name):
+    """
+    Loads `template_name` with the engine set by the `UNIFORM_TEMPLATE_ENGINE` setting,
+    `'django'` by default or `'jinja2'`.
+    """
+    profiling.count('templates')
+    engine = getattr(settings, 'UNIFORM_TEMPLATE_ENGINE', 'django')
+    if engine == 'jinja2':
+        try:
+            from uni_form import jinja
+        except ImportError, e:
+            raise ImproperlyConfigured("UNIFORM_TEMPLATE_ENGINE is 'jinja2' but Jinja2 can't be imported: %s" % e)
+        return jinja.get_template(template_name)
+    elif engine != 'django':
+        raise ImproperlyConfigured("Unknown UNIFORM_TEMPLATE_ENGINE '%s'" % engine)
+
+    inline = getattr(settings, 'UNIFORM_INLINE_INCLUDES', True)
+    compact = getattr(settings, 'UNIFORM_COMPACT_WHITESPACE', False)
+    if not inline and not compact:
+        return loader.get_template(template_name)
+
+    try:
+        source = find_template_source(template_name)[0]
+    except TemplateDoesNotExist:
+        # Loaders only loading compiled templates, without their source
+        return loader.get_template(template_name)
+    if inline:
+        source = inline_includes(source, (template_name,))
+    if compact:
+        source = compact_whitespace(source)
+    return Template(source, name=template_name)
+
+
+def inline_includes(source, parents=()):
+    """
+    Returns the template `source` with its `{% include %}` tags of a constant template
+    name replaced by the source of the included template, its own includes inlined,
+    and the variables they set by a `{% with %}` tag. The output is the same, without
+    rendering included templates. Includes with `only`, of templates in `parents`,
+    using template inheritance, not found or not compiling are left alone.
+    """
+    def replace(match):
+        template_name = match.group(1) or match.group(2)
+        variables = match.group(3)
+        if template_name in parents or (variables and re.search(r'\bonly$', variables)):
+            return match.group(0)
+
+        try:
+            included = find_template_source(template_name)[0]
+        except TemplateDoesNotExist:
+            return match.group(0)
+        if INHERITANCE_RE.search(included):
+            return match.group(0)
+
+        included = inline_includes(included, parents + (template_name,))
+        # Django renders includes failing to compile as nothing, unless TEMPLATE_DEBUG
+        try:
+            Template(included, name=template_name)
+        except TemplateSyntaxError:
+            return match.group(0)
+        if variables:
+            return u'{%% with %s %%}%s{%% endwith %%}' % (variables, included)
+        return included
+
+    return INCLUDE_RE.sub(replace, source)
+
+
+def get_template(template_name):
+    """
+    Returns the compiled template `template_name`, compiling it only the first time
+    unless the `UNIFORM_CACHE_TEMPLATES` setting, which defaults to `not DEBUG`, is off.
+    """
+    if not getattr(settings, 'UNIFORM_CACHE_TEMPLATES', not settings.DEBUG):
+        return load_template(template_name)
+
+    key = (getattr(settings, 'UNIFORM_TEMPLATE_ENGINE', 'django'), getattr(settings, 'UNIFORM_INLINE_INCLUDES', True),
+        getattr(settings, 'UNIFORM_COMPACT_WHITESPACE', False), template_name)
+    try:
+        return _templates[key]
+    except KeyError:
+        template = _templates[key] = load_template(template_name)
+        return template
+
+
+def select_template(template_names):
+    """
+    Returns the compiled template of the first of `template_names` that exists, like
+    Django's `select_template`.
+    """
+    for template_name in template_names:
+        try:
+            return get_template(template_name)
+        except TemplateDoesNotExist:
+            continue
+    raise TemplateDoesNotExist(', '.join(template_names))
+
+
+def render_to_string(template_name, dictionary=None):
+    """
+    Renders the compiled template `template_name`, or the first existing one if it's
+    a list of names like Django's `render_to_string` takes, with `dictionary`.
+    """
+    profiling.count('render_to_string')
+    if isinstance(template_name, (list, tuple)):
+        template = select_template(template_name)
+    else:
+        template = get_template(template_name)
+    return template.render(Context(dictionary))
+
+
+def clear_cache():
+    _templates.clear()
+
+
+def find_template_source(template_name):
+    """
+    Returns a tuple with the source of `template_name` and its origin, going through
+    the template loaders like Django does. Raises `TemplateDoesNotExist` if not found.
+    """
+    for loader_name in settings.TEMPLATE_LOADERS:
+        template_loader = loader.find_template_loader(loader_name)
+        if template_loader is None:
+            continue
+
+        # The cached loader doesn't load sources but wraps loaders that do
+        for source_loader in getattr(template_loader, 'loaders', [template_loader]):
+            try:
+                return source_loader.load_template_source(template_name)
+            except (TemplateDoesNotExist, NotImplementedError):
+                pass
+
+    raise TemplateDoesNotExist(template_name)
+
+
+def is_overridden(origin):
+    """
+    Tells if a template `origin` returned by `find_template_source` is not one of the
+    templates shipped with uni_form.
+    """
+    return not os.path.abspath(origin).startswith(os.path.abspath(TEMPLATES_DIR) + os.sep)
+
+
+def compact_whitespace(source):
+    """
+    Returns the template `source` with its runs of whitespace turned into a single
+    space, which browsers display the same. Only whitespace written in the template is
+    compacted, not the one output by variables, and the content of `<pre>`,
+    `<textarea>`, `<script>` and `<style>` elements is left alone.
+    """
+    compacted = []
+    position = 0
+    for match in PRESERVED_RE.finditer(source):
+        compacted.append(compact_text(source[position:match.start()]))
+        compacted.append(match.group(0))
+        position = match.end()
+    compacted.append(compact_text(source[position:]))
+    return u''.join(compacted)
+
+
+def compact_text(source):
+    bits = []
+    for bit in tag_re.split(source):
+        if not bit.startswith('{{') and not bit.startswith('{%') and not bit.startswith('{#'):
+            bit = re.sub(r'\s+', ' ', bit)
+        bits.append(bit)
+    return u''.join(bits)
@@ -0,0 +1,35 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from uni_form.bundles import THEMES, build_bundles, get_bundle_root
+
+
+class Command(BaseCommand):
+    help = "Builds minified and content hashed bundles of uni-form's css and javascript for {% uni_form_setup bundled %}."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--output-dir', dest='output_dir', default=None,
+            help='Directory where bundles are written. Defaults to the UNIFORM_BUNDLE_ROOT setting.'),
+        make_option('--theme', action='append', dest='themes', default=None,
+            help='Theme to bundle, can be repeated. Defaults to all of them: %s.' % ', '.join(THEMES)),
+        make_option('--with-jquery', action='store_true', dest='include_jquery', default=False,
+            help='Also build a javascript bundle starting with the jQuery shipped with uni-form.'),
+    )
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir'] or get_bundle_root()
+        if not output_dir:
+            raise CommandError('Set STATIC_ROOT or UNIFORM_BUNDLE_ROOT, or use --output-dir.')
+
+        themes = options['themes'] or THEMES
+        for theme in themes:
+            if theme not in THEMES:
+                raise CommandError("Unknown theme '%s', choose from: %s." % (theme, ', '.join(THEMES)))
+
+        manifest = build_bundles(output_dir, themes, options['include_jquery'])
+        filenames = sorted(manifest['css'].values()) + [manifest['js']]
+        if 'js_jquery' in manifest:
+            filenames.append(manifest['js_jquery'])
+        for filename in filenames:
+            self.stdout.write('Written %s\n' % filename)
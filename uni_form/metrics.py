@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+    In process metrics of the renders done by uni_form, aggregated by form class
+    and helper: how many renders, how long they took, their output size, how many
+    ran out of their budget and their number of fields. They are kept when the
+    `UNIFORM_METRICS` setting is on, and exported in the Prometheus text format by
+    `export_text` and the `metrics` view.
+
+"""
+import threading
+
+from django.conf import settings
+
+# Upper bounds in seconds of the render time histogram buckets
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_metrics = {}
+_lock = threading.Lock()
+
+
+class RenderMetrics(object):
+    """
+    Aggregated renders of a form class with a helper class.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.size = 0
+        self.fields = 0
+        self.degraded = 0
+        self.buckets = [0] * len(TIME_BUCKETS)
+
+    def observe(self, record):
+        self.count += 1
+        self.time += record.time
+        self.size += record.size
+        self.fields = record.fields
+        if record.degraded:
+            self.degraded += 1
+        for index, bound in enumerate(TIME_BUCKETS):
+            if record.time <= bound:
+                self.buckets[index] += 1
+
+
+def is_enabled():
+    return getattr(settings, 'UNIFORM_METRICS', False)
+
+
+def observe(record):
+    """
+    Adds a finished `uni_form.profiling.RenderRecord` to the metrics.
+    """
+    key = record.key
+    _lock.acquire()
+    try:
+        if key not in _metrics:
+            _metrics[key] = RenderMetrics()
+        _metrics[key].observe(record)
+    finally:
+        _lock.release()
+
+
+def get_metrics():
+    """
+    Returns a dictionary with a copy of the `RenderMetrics` of every form class and
+    helper class pair rendered, keyed by `(form_class, helper_class)` with the classes
+    named by their module path.
+    """
+    _lock.acquire()
+    try:
+        metrics = {}
+        for key, render_metrics in _metrics.items():
+            copy = metrics[key] = RenderMetrics()
+            copy.__dict__.update(render_metrics.__dict__)
+            copy.buckets = list(render_metrics.buckets)
+        return metrics
+    finally:
+        _lock.release()
+
+
+def reset():
+    _lock.acquire()
+    try:
+        _metrics.clear()
+    finally:
+        _lock.release()
+
+
+def format_labels(form_class, helper_class, **extra):
+    labels = [('form', form_class), ('helper', helper_class or '')] + sorted(extra.items())
+    return u','.join([u'%s="%s"' % (name, unicode(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels])
+
+
+def export_text():
+    """
+    Returns the metrics in the Prometheus text exposition format: a render time
+    histogram, and the totals of renders, output bytes, renders out of budget and
+    fields per form class and helper class.
+    """
+    metrics = sorted(get_metrics().items())
+    lines = [
+        u'# HELP uni_form_render_seconds Time taken rendering forms with uni_form.',
+        u'# TYPE uni_form_render_seconds histogram',
+    ]
+    for (form_class, helper_class), render_metrics in metrics:
+        for bound, count in zip(TIME_BUCKETS, render_metrics.buckets):
+            lines.append(u'uni_form_render_seconds_bucket{%s} %d' % (
+                format_labels(form_class, helper_class, le=repr(bound)), count))
+        lines.append(u'uni_form_render_seconds_bucket{%s} %d' % (
+            format_labels(form_class, helper_class, le='+Inf'), render_metrics.count))
+        labels = format_labels(form_class, helper_class)
+        lines.append(u'uni_form_render_seconds_sum{%s} %f' % (labels, render_metrics.time))
+        lines.append(u'uni_form_render_seconds_count{%s} %d' % (labels, render_metrics.count))
+
+    lines.extend([
+        u'# HELP uni_form_render_bytes_total Bytes of html output by uni_form renders.',
+        u'# TYPE uni_form_render_bytes_total counter',
+    ])
+    for (form_class, helper_class), render_metrics in metrics:
+        lines.append(u'uni_form_render_bytes_total{%s} %d' % (
+            format_labels(form_class, helper_class), render_metrics.size))
+
+    lines.extend([
+        u'# HELP uni_form_render_degraded_total Renders that ran out of their render budget.',
+        u'# TYPE uni_form_render_degraded_total counter',
+    ])
+    for (form_class, helper_class), render_metrics in metrics:
+        lines.append(u'uni_form_render_degraded_total{%s} %d' % (
+            format_labels(form_class, helper_class), render_metrics.degraded))
+
+    lines.extend([
+        u'# HELP uni_form_form_fields Number of fields in the last render of a form.',
+        u'# TYPE uni_form_form_fields gauge',
+    ])
+    for (form_class, helper_class), render_metrics in metrics:
+        lines.append(u'uni_form_form_fields{%s} %d' % (
+            format_labels(form_class, helper_class), render_metrics.fields))
+
+    return u'\n'.join(lines) + u'\n'
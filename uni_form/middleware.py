@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+    Middleware for finding out what uni_form costs every request, meant for
+    development and staging servers.
+
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from uni_form import profiling
+
+
+class RenderProfilingMiddleware(object):
+    """
+    Records every uni_form render done while handling a request and reports them in
+    the response: a summary in the `X-UniForm-Profile` header and, for html pages, a
+    line per render in an html comment before `</body>`, like::
+
+        <!-- uni_form renders:
+            ContactForm helper=FormHelper layout=yes fields=6 templates=0 render_to_string=6 queries=1 time=4.2ms size=3120
+        -->
+
+    Queries are counted through the debug cursor, which is turned on for the request.
+    It's only used when the `UNIFORM_PROFILING` setting, which defaults to `DEBUG`, is on.
+    """
+    def __init__(self):
+        if not getattr(settings, 'UNIFORM_PROFILING', settings.DEBUG):
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+        request._uni_form_use_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        profiling.start_recording()
+
+    def process_response(self, request, response):
+        if not profiling.is_recording():
+            return response
+
+        records = profiling.stop_recording()
+        connection.use_debug_cursor = getattr(request, '_uni_form_use_debug_cursor', None)
+
+        response['X-UniForm-Profile'] = 'renders=%d; queries=%d; time=%.1fms' % (len(records),
+            sum([record.queries for record in records]), sum([record.time for record in records]) * 1000)
+
+        if records and response['Content-Type'].startswith('text/html'):
+            comment = u'<!-- uni_form renders:\n%s\n-->\n' % u'\n'.join([u'    %s' % record for record in records])
+            content = response.content.decode(settings.DEFAULT_CHARSET)
+            position = content.rfind(u'</body>')
+            if position == -1:
+                position = len(content)
+            response.content = (content[:position] + comment + content[position:]).encode(settings.DEFAULT_CHARSET)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+
+        return response
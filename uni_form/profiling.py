@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+    Recording of every uni_form render done while handling a request: what was
+    rendered, how many templates and queries it took and how long. It's started
+    and reported by `uni_form.middleware.RenderProfilingMiddleware`. Renders are 
+    also recorded, one at a time, for the aggregated `uni_form.metrics`.
+
+"""
+import threading
+import time
+
+from django.db import connection
+
+from uni_form import metrics
+
+_local = threading.local()
+
+
+def get_class_path(cls):
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+class RenderRecord(object):
+    """
+    What a single render of a form or formset by uni_form took.
+    """
+    def __init__(self, form, helper=None):
+        self.form_class = form.__class__.__name__
+        self.helper_class = helper is not None and helper.__class__.__name__ or None
+        # Same named classes of different modules are told apart by the metrics
+        self.key = (get_class_path(form.__class__), helper is not None and get_class_path(helper.__class__) or None)
+        self.layout = bool(getattr(helper, 'layout', None))
+
+        forms = getattr(form, 'forms', None)
+        if forms is None:
+            self.fields = len(form.fields)
+        else:
+            self.fields = sum([len(each.fields) for each in forms])
+
+        self.templates = 0
+        self.render_to_string = 0
+        self.queries = 0
+        self.time = 0.0
+        self.size = 0
+        self.degraded = False
+
+        self.start_queries = len(connection.queries)
+        self.start_time = time.time()
+
+    def finish(self, html):
+        self.time = time.time() - self.start_time
+        self.queries = len(connection.queries) - self.start_queries
+        self.size = len(html or u'')
+
+    def __unicode__(self):
+        return u'%s helper=%s layout=%s fields=%d templates=%d render_to_string=%d queries=%d time=%.1fms size=%d%s' % (
+            self.form_class, self.helper_class, self.layout and 'yes' or 'no', self.fields,
+            self.templates, self.render_to_string, self.queries, self.time * 1000, self.size,
+            self.degraded and ' degraded' or '')
+
+
+def start_recording():
+    _local.records = []
+    _local.active = []
+
+
+def stop_recording():
+    """
+    Stops recording renders in this thread and returns the `RenderRecord` of each one.
+    """
+    records = getattr(_local, 'records', None) or []
+    _local.records = None
+    _local.active = []
+    return records
+
+
+def is_recording():
+    return getattr(_local, 'records', None) is not None
+
+
+def begin_render(form, helper=None):
+    """
+    Starts recording a render of `form`, if renders are being recorded in this thread
+    or metrics are on. Returns the record to pass to `end_render`, or None.
+    """
+    if not is_recording() and not metrics.is_enabled():
+        return None
+
+    if not hasattr(_local, 'active'):
+        _local.active = []
+
+    record = RenderRecord(form, helper)
+    _local.active.append(record)
+    return record
+
+
+def end_render(record, html):
+    if record is None:
+        return
+
+    record.finish(html)
+    if record in _local.active:
+        _local.active.remove(record)
+    if is_recording():
+        _local.records.append(record)
+    if metrics.is_enabled():
+        metrics.observe(record)
+
+
+def count(name):
+    """
+    Counts one more `templates` or `render_to_string` call in the renders in progress.
+    """
+    for record in getattr(_local, 'active', ()):
+        setattr(record, name, getattr(record, name) + 1)
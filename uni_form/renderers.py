@@ -0,0 +1,514 @@
+# -*- coding: utf-8 -*-
+"""
+    Renderers, the strategies uni_form renders forms with. The tags, the filters
+    and the layout objects hand the rendering of fields and whole forms to the
+    renderer set by the helper's `renderer` attribute or the `UNIFORM_RENDERER`
+    setting, so strategies can be swapped without changing forms or layouts:
+
+        * `TemplateRenderer`, the default, renders everything with the uni_form
+          templates.
+        * `PythonRenderer` renders fields and field lists in Python, outputting the
+          markup of the templates shipped with uni_form. Templates overridden by the
+          project are still rendered with the template engine.
+        * `CompiledRenderer` renders with the uni_form templates, overridden ones
+          included, compiled into Python functions.
+        * `SkeletonRenderer` builds the markup of every field once, leaving slots for
+          its errors and value, and fills them on every render.
+
+    Both settings take a renderer class, an instance or a dotted path to a class.
+
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, TemplateDoesNotExist
+from django.forms.widgets import TextInput, PasswordInput, HiddenInput, Textarea, CheckboxInput
+from django.utils.encoding import force_unicode
+from django.utils.functional import Promise
+from django.utils.html import conditional_escape
+from django.utils.importlib import import_module
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from uni_form import compiler, loader, translation
+from uni_form.cache import LRUCache
+from uni_form.templatetags.uni_form_field import is_checkbox, widget_css_class, with_class
+
+DEFAULT_RENDERER = 'uni_form.renderers.TemplateRenderer'
+
+_renderers = {}
+_local = threading.local()
+
+
+class BaseRenderer(object):
+    """
+    Renders forms for uni_form. Subclasses implement `render`, and override the
+    other methods for rendering some parts their own way.
+    """
+    def render(self, template_name, context):
+        """
+        Renders `template_name`, or what it would output, with `context`, a `Context`
+        or a dictionary.
+        """
+        raise NotImplementedError
+
+    def render_field(self, bound_field, template='uni_form/field.html', labelclass=None):
+        return self.render(template, {'field': bound_field, 'labelclass': labelclass})
+
+    def prepare(self):
+        """
+        Called by `uni_form.warmup.warm_up`, for doing at startup the work the first
+        renders would do.
+        """
+        pass
+
+    def render_form(self, context):
+        """
+        Renders the whole form or formset of the `{% uni_form %}` tag, from the context
+        built by the tag. The fields of forms without a layout are rendered first with
+        `render_fields`.
+        """
+        for form in get_forms(context):
+            form.fields_html = None
+            if not getattr(form, 'form_html', None):
+                form.fields_html = self.render_fields(form, context)
+        return self.render_whole_form(context)
+
+    def render_fields(self, form, context):
+        """
+        Renders `form` without a layout: its errors and its fields, what
+        `uni_form/uni_form.html` outputs.
+        """
+        context.push()
+        try:
+            context['form'] = form
+            return self.render('uni_form/uni_form.html', context)
+        finally:
+            context.pop()
+
+    def render_whole_form(self, context):
+        if context['is_formset']:
+            return self.render('uni_form/whole_uni_formset.html', context)
+        return self.render('uni_form/whole_uni_form.html', context)
+
+
+class TemplateRenderer(BaseRenderer):
+    """
+    Renders everything with the uni_form templates.
+    """
+    def render_form(self, context):
+        # The whole form templates include uni_form.html themselves
+        for form in get_forms(context):
+            form.fields_html = None
+        return self.render_whole_form(context)
+
+    def render(self, template_name, context):
+        if not isinstance(context, Context):
+            return loader.render_to_string(template_name, context)
+        return loader.get_template(template_name).render(context)
+
+
+class CompiledRenderer(TemplateRenderer):
+    """
+    Renders with the uni_form templates, the ones overridden by the project
+    included, compiled into Python functions by `uni_form.compiler`. Templates it
+    can't compile are rendered with the template engine.
+    """
+    def prepare(self):
+        for template_name in compiler.compile_templates():
+            logging.info("Template '%s' can't be compiled, it will be rendered with the template engine" % template_name)
+
+    def render(self, template_name, context):
+        if getattr(settings, 'UNIFORM_TEMPLATE_ENGINE', 'django') == 'django':
+            function = compiler.get_function(template_name)
+            if function is not None:
+                return function(compiler.make_context(context))
+        return super(CompiledRenderer, self).render(template_name, context)
+
+
+class PythonRenderer(TemplateRenderer):
+    """
+    Renders fields and field lists in Python, outputting the markup of the templates
+    shipped with uni_form, and everything else with the templates. Fields are
+    rendered with the templates if the project overrides theirs.
+    """
+    def __init__(self):
+        self.overridden = {}
+
+    def render_form(self, context):
+        return BaseRenderer.render_form(self, context)
+
+    def is_overridden(self, template_name):
+        try:
+            return self.overridden[template_name]
+        except KeyError:
+            if getattr(settings, 'UNIFORM_TEMPLATE_ENGINE', 'django') != 'django':
+                overridden = True
+            else:
+                try:
+                    overridden = loader.is_overridden(loader.find_template_source(template_name)[1])
+                except TemplateDoesNotExist:
+                    overridden = True
+            self.overridden[template_name] = overridden
+            return overridden
+
+    def render(self, template_name, context):
+        if template_name == 'uni_form/uni_form.html' and not self.is_overridden(template_name):
+            form = context['form']
+            html = [super(PythonRenderer, self).render('uni_form/errors.html', context)]
+            for bound_field in form:
+                html.append(self.render_field(bound_field))
+            return mark_safe(u'\n'.join(html))
+        return super(PythonRenderer, self).render(template_name, context)
+
+    def render_field(self, bound_field, template='uni_form/field.html', labelclass=None):
+        if self.is_overridden(template):
+            return super(PythonRenderer, self).render_field(bound_field, template, labelclass)
+
+        if template == 'uni_form/field.html':
+            return self.render_ctrl_holder(bound_field)
+        elif template == 'uni_form/multifield.html':
+            return self.render_multifield_field(bound_field, labelclass)
+        return super(PythonRenderer, self).render_field(bound_field, template, labelclass)
+
+    def render_ctrl_holder(self, bound_field):
+        if bound_field.is_hidden:
+            return force_unicode(bound_field)
+
+        return mark_safe(u''.join(self.ctrl_holder_segments(bound_field, render_error_class(bound_field),
+            render_errors(bound_field), force_unicode(with_class(bound_field)))))
+
+    def ctrl_holder_segments(self, bound_field, error_class, errors, widget):
+        """
+        Returns the markup of the ctrlHolder of `bound_field`, as a list of strings with
+        `error_class`, `errors` and `widget` in their places.
+        """
+        auto_id = conditional_escape(bound_field.auto_id)
+        widget_class = bound_field.field.widget.attrs.get('class')
+
+        label = u''
+        if bound_field.label:
+            required = bound_field.field.required
+            label = u'<label for="%s" %s>\n%s%s\n</label>\n' % (auto_id,
+                required and u'class="requiredField"' or u'', force_unicode(translation.resolve(bound_field.label)),
+                required and u'<span class="asteriskField">*</span>' or u'')
+
+        help_text = u''
+        if bound_field.help_text:
+            help_text = u'<div id="hint_%s" class="formHint">%s</div>\n' % (auto_id,
+                force_unicode(translation.resolve(bound_field.help_text)))
+
+        return [u'<div id="div_%s" class="ctrlHolder' % auto_id, error_class,
+            u'%s %s">\n' % (is_checkbox(bound_field) and u' checkbox' or u'',
+                widget_class and u' %s' % conditional_escape(widget_class) or u''),
+            errors, label, widget, u'\n%s</div>' % help_text]
+
+    def render_multifield_field(self, bound_field, labelclass=None):
+        if bound_field.is_hidden:
+            return force_unicode(bound_field)
+
+        return mark_safe(u''.join(self.multifield_segments(bound_field, labelclass,
+            force_unicode(with_class(bound_field)))))
+
+    def multifield_segments(self, bound_field, labelclass, widget):
+        """
+        Returns the markup of `bound_field` in a `MultiField`, as a list of strings with
+        `widget` in its place.
+        """
+        if not bound_field.label:
+            return [widget]
+
+        label_tag = u'<label for="%s"%s>\n' % (conditional_escape(bound_field.auto_id),
+            labelclass and u' class="%s"' % conditional_escape(labelclass) or u'')
+        label = conditional_escape(force_unicode(translation.resolve(bound_field.label)))
+        if is_checkbox(bound_field):
+            return [label_tag, widget, u'\n%s\n</label>' % label]
+        return [u'%s%s\n' % (label_tag, label), widget, u'\n</label>']
+
+
+def render_error_class(bound_field):
+    return bound_field.errors and u' error' or u''
+
+
+def render_errors(bound_field):
+    auto_id = conditional_escape(bound_field.auto_id)
+    return u''.join([u'<p id="error_%d_%s" class="errorField">\n%s\n</p>\n' % (counter + 1, auto_id,
+        force_unicode(error)) for counter, error in enumerate(bound_field.errors)])
+
+
+class Slot(object):
+    """
+    A place in a `Skeleton` filled on every render.
+    """
+    def __init__(self, name):
+        self.name = name
+
+
+ERROR_CLASS = Slot('error_class')
+ERRORS = Slot('errors')
+WIDGET = Slot('widget')
+
+# Widgets whose html only changes with their value, and how it shows
+SLOT_WIDGETS = {
+    TextInput: 'value',
+    PasswordInput: 'value',
+    HiddenInput: 'value',
+    Textarea: 'text',
+    CheckboxInput: 'checked',
+}
+
+SENTINEL = u'\x00uni_form_slot\x00'
+
+
+class Skeleton(object):
+    """
+    Markup split in static strings and the `Slot` objects filled on every render.
+    """
+    def __init__(self, segments):
+        self.segments = []
+        self.slots = []
+        static = False
+        for segment in segments:
+            if isinstance(segment, Slot):
+                self.slots.append((len(self.segments), segment.name))
+                self.segments.append(u'')
+                static = False
+            elif static:
+                self.segments[-1] += segment
+            else:
+                self.segments.append(segment)
+                static = True
+
+    def fill(self, values):
+        segments = list(self.segments)
+        for index, name in self.slots:
+            segments[index] = values[name]
+        return u''.join(segments)
+
+
+def get_widget_segments(bound_field, attrs=None):
+    """
+    Splits the html of the widget of `bound_field`, rendered like `BoundField.as_widget`
+    does with `attrs`, in static strings and a `Slot` for its value or checked state.
+    Returns None if its widget isn't one of `SLOT_WIDGETS` or its html changes in
+    other ways.
+    """
+    widget = bound_field.field.widget
+    kind = SLOT_WIDGETS.get(type(widget))
+    if kind is None:
+        return None
+
+    attrs = dict(attrs or {})
+    if bound_field.auto_id and 'id' not in widget.attrs:
+        attrs['id'] = bound_field.auto_id
+    name = bound_field.html_name
+
+    if kind == 'checked':
+        marker = u' checked="checked"'
+        empty = widget.render(name, False, dict(attrs))
+        before, found, after = widget.render(name, True, dict(attrs)).partition(marker)
+    else:
+        marker = kind == 'value' and u' value="%s"' % SENTINEL or SENTINEL
+        empty = widget.render(name, None, dict(attrs))
+        filled = widget.render(name, SENTINEL, dict(attrs))
+        if SENTINEL not in filled:
+            # The widget doesn't show its value, like a PasswordInput
+            return filled == empty and [filled] or None
+        before, found, after = filled.partition(marker)
+
+    if not found or before + after != empty:
+        return None
+    return [before, Slot(kind), after]
+
+
+class SkeletonRenderer(PythonRenderer):
+    """
+    Renders fields from skeletons: their markup, built once per form class, field,
+    template and language, split in static strings and slots for what changes from
+    one render to another, the errors and the value or checked state of the widget.
+    Fields with other widgets are rendered like `PythonRenderer` does. At most
+    `max_size` skeletons are kept, by default the `UNIFORM_SKELETON_CACHE_SIZE`
+    setting or 1000.
+    """
+    def __init__(self, max_size=None):
+        super(SkeletonRenderer, self).__init__()
+        if max_size is None:
+            max_size = getattr(settings, 'UNIFORM_SKELETON_CACHE_SIZE', 1000)
+        self.skeletons = LRUCache(max_size)
+
+    def render_field(self, bound_field, template='uni_form/field.html', labelclass=None):
+        if type(bound_field.field.widget) not in SLOT_WIDGETS or \
+                template not in ('uni_form/field.html', 'uni_form/multifield.html') or self.is_overridden(template):
+            return super(SkeletonRenderer, self).render_field(bound_field, template, labelclass)
+
+        key = get_skeleton_key(bound_field, template, labelclass)
+        try:
+            skeleton = self.skeletons.get(key, _missing)
+        except TypeError:
+            # Widget attributes that can't be hashed
+            skeleton = None
+        if skeleton is _missing:
+            skeleton = self.build_skeleton(bound_field, template, labelclass)
+            self.skeletons.set(key, skeleton)
+
+        values = None
+        if skeleton is not None:
+            values = self.get_slot_values(bound_field, skeleton)
+        if values is None:
+            return super(SkeletonRenderer, self).render_field(bound_field, template, labelclass)
+        return mark_safe(skeleton.fill(values))
+
+    def build_skeleton(self, bound_field, template, labelclass=None):
+        """
+        Returns the `Skeleton` of `bound_field` rendered with `template`, or None if its
+        widget can't be split in slots.
+        """
+        if bound_field.is_hidden:
+            segments = get_widget_segments(bound_field)
+            if segments is None or bound_field.field.show_hidden_initial:
+                return None
+            return Skeleton(segments)
+
+        widget = get_widget_segments(bound_field, {'class': widget_css_class(bound_field)})
+        if widget is None:
+            return None
+
+        if template == 'uni_form/field.html':
+            segments = self.ctrl_holder_segments(bound_field, ERROR_CLASS, ERRORS, WIDGET)
+        else:
+            segments = self.multifield_segments(bound_field, labelclass, WIDGET)
+        index = segments.index(WIDGET)
+        return Skeleton(segments[:index] + widget + segments[index + 1:])
+
+    def get_slot_values(self, bound_field, skeleton):
+        """
+        Returns a dictionary with the html filling every slot of `skeleton` for
+        `bound_field`, or None if its value can't be shown through the slots.
+        """
+        values = {}
+        for index, name in skeleton.slots:
+            if name == 'error_class':
+                values[name] = render_error_class(bound_field)
+            elif name == 'errors':
+                values[name] = render_errors(bound_field)
+            else:
+                value = get_widget_value(bound_field, name)
+                if value is None:
+                    return None
+                values[name] = value
+        return values
+
+
+def get_widget_value(bound_field, kind):
+    """
+    Returns the html a widget's `kind` of slot shows for the value of `bound_field`,
+    or None if it shows differently.
+    """
+    widget = bound_field.field.widget
+    value = bound_field.value()
+    if kind == 'checked':
+        if value not in ('', True, False, None):
+            return None
+        try:
+            checked = widget.check_test(value)
+        except:
+            checked = False
+        return checked and u' checked="checked"' or u''
+    elif kind == 'text':
+        if value is None:
+            value = u''
+        return conditional_escape(force_unicode(value))
+
+    if isinstance(widget, PasswordInput) and not widget.render_value or value is None or value == '':
+        return u''
+    return u' value="%s"' % conditional_escape(force_unicode(widget._format_value(value)))
+
+
+def get_skeleton_key(bound_field, template, labelclass=None):
+    field = bound_field.field
+    return (bound_field.form.__class__, template, labelclass, bound_field.html_name, bound_field.auto_id,
+        get_language(), type(field.widget), getattr(field.widget, 'input_type', None),
+        tuple(sorted(field.widget.attrs.items())), text_key(field.label), text_key(field.help_text), field.required)
+
+
+def get_forms(context):
+    """
+    Returns the forms the context of the `{% uni_form %}` tag renders.
+    """
+    if not context['is_formset']:
+        return [context['form']]
+    forms = list(context['formset_forms'])
+    if context.get('empty_form'):
+        forms.append(context['empty_form'])
+    return forms
+
+
+def text_key(text):
+    """
+    Returns a hashable key for `text`, identifying lazy translations by the object.
+    """
+    if isinstance(text, Promise):
+        return id(text)
+    return text
+
+
+_missing = object()
+
+
+def get_renderer(helper=None):
+    """
+    Returns the renderer set by the `renderer` attribute of `helper` or else by the
+    `UNIFORM_RENDERER` setting, defaulting to `TemplateRenderer`.
+    """
+    renderer = getattr(helper, 'renderer', None)
+    if renderer is None:
+        renderer = getattr(settings, 'UNIFORM_RENDERER', DEFAULT_RENDERER)
+    if isinstance(renderer, BaseRenderer):
+        return renderer
+
+    try:
+        return _renderers[renderer]
+    except KeyError:
+        pass
+
+    renderer_class = renderer
+    if isinstance(renderer, basestring):
+        module_name, class_name = renderer.rsplit('.', 1)
+        try:
+            renderer_class = getattr(import_module(module_name), class_name)
+        except (ImportError, AttributeError), e:
+            raise ImproperlyConfigured("Could not import renderer '%s': %s" % (renderer, e))
+
+    instance = _renderers[renderer] = renderer_class()
+    return instance
+
+
+def activate(renderer):
+    """
+    Sets the renderer of the render starting in this thread. Returns the one it
+    replaces, to hand to `deactivate` once the render ends, as renders can be nested.
+    """
+    previous = getattr(_local, 'renderer', None)
+    _local.renderer = renderer
+    return previous
+
+
+def deactivate(previous=None):
+    _local.renderer = previous
+
+
+def get_active():
+    """
+    Returns the renderer of the render in progress in this thread, or else the one set
+    by the `UNIFORM_RENDERER` setting.
+    """
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = get_renderer()
+    return renderer
+
+
+def clear_cache():
+    _renderers.clear()
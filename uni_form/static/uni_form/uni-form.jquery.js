@@ -4,8 +4,18 @@
  * @see http://sprawsm.com/uni-form/
  * @license MIT http://www.opensource.org/licenses/mit-license.php
  */
-jQuery.fn.uniform=function(settings){settings=jQuery.extend({valid_class:'valid',invalid_class:'invalid',error_class:'error',focused_class:'focused',holder_class:'ctrlHolder',field_selector:'input, textarea, select',default_value_color:"#AFAFAF"},settings);return this.each(function(){var form=jQuery(this),validate=function($input,valid,text){var $p=$input.closest('div.'+settings.holder_class).andSelf().toggleClass(settings.invalid_class,!valid).toggleClass(settings.error_class,!valid).toggleClass(settings.valid_class,valid).find('p.formHint');if(!valid&&!$p.data('info-text')){$p.data('info-text',$p.html());}else if(valid){text=$p.data('info-text');}
+jQuery.fn.uniform=function(settings){settings=jQuery.extend({valid_class:'valid',invalid_class:'invalid',error_class:'error',focused_class:'focused',holder_class:'ctrlHolder',field_selector:'input, textarea, select',default_value_color:"#AFAFAF",validation_url:null,validation_delay:250,fragment_submit:false},settings);return this.each(function(){var form=jQuery(this),validate=function($input,valid,text){var $p=$input.closest('div.'+settings.holder_class).andSelf().toggleClass(settings.invalid_class,!valid).toggleClass(settings.error_class,!valid).toggleClass(settings.valid_class,valid).find('p.formHint');if(!valid&&!$p.data('info-text')){$p.data('info-text',$p.html());}else if(valid){text=$p.data('info-text');}
 if(text){$p.html(text);}};form.submit(function(){form.find(settings.field_selector).each(function(){if($(this).val()==$(this).data('default-value'))$(this).val("");});})
 form.find(settings.field_selector).each(function(){var $input=$(this),value=$input.val();$input.data('default-color',$input.css('color'));if(value==$input.data('default-value')||!value){$input.not('select').css("color",settings.default_value_color);$input.val($input.data('default-value'));}})
 form.delegate(settings.field_selector,'focus',function(){form.find('.'+settings.focused_class).removeClass(settings.focused_class);var $input=$(this);$input.parents().filter('.'+settings.holder_class+':first').addClass(settings.focused_class);if($input.val()==$input.data('default-value')){$input.val("");}
-$input.not('select').css('color',$input.data('default-color'));});form.delegate(settings.field_selector,'blur',function(){var $input=$(this);form.find('.'+settings.focused_class).removeClass(settings.focused_class);if($input.val()==""||$input.val()==$input.data('default-value')){$input.not('select').css("color",settings.default_value_color);$input.val($input.data('default-value'));}else{$input.css('color',$input.data('default-color'));}});form.delegate(settings.field_selector,'error',function(e,text){validate($(this),false,text);});form.delegate(settings.field_selector,'success',function(e,text){validate($(this),true);});});};
\ No newline at end of file
+$input.not('select').css('color',$input.data('default-color'));});form.delegate(settings.field_selector,'blur',function(){var $input=$(this);form.find('.'+settings.focused_class).removeClass(settings.focused_class);if($input.val()==""||$input.val()==$input.data('default-value')){$input.not('select').css("color",settings.default_value_color);$input.val($input.data('default-value'));}else{$input.css('color',$input.data('default-color'));}});form.delegate(settings.field_selector,'error',function(e,text){validate($(this),false,text);});form.delegate(settings.field_selector,'success',function(e,text){validate($(this),true);});form.find('select[data-choices-url]').uniformRemoteSelect({delay:settings.validation_delay});if(settings.validation_url){var timers={};form.delegate(settings.field_selector,'blur',function(){var $input=jQuery(this),name=$input.attr('name');if(!name){return;}
+clearTimeout(timers[name]);timers[name]=setTimeout(function(){var data=form.serializeArray();data.push({name:'uni_form_fields',value:name});jQuery.post(settings.validation_url,data,function(response){var result=response[name];if(!result){return;}
+var $holder=$input.closest('div.'+settings.holder_class);$holder.find('p.errorField').remove();$holder.prepend(jQuery.map(result.errors,function(error,i){return'<p id="error_'+(i+1)+'_'+result.id+'" class="errorField">'+error+'</p>';}).join(''));$input.trigger(result.valid?'success':'error');},'json');},settings.validation_delay);});}
+form.find('div.formsetWindow').uniformFormsetWindow();form.delegate('[data-formset-add]','click',function(){form.uniformAddForm(jQuery(this).attr('data-formset-add'));return false;});if(settings.fragment_submit){form.submit(function(){var data=form.serializeArray();form.find('div.'+settings.holder_class+'.'+settings.error_class).each(function(){data.push({name:'uni_form_error_ids',value:this.id});});jQuery.post(form.attr('action'),data,function(response){if(response.valid&&response.redirect){window.location=response.redirect;}else if(response.submit){form[0].submit();}else{form.uniformPatch(response);}},'json');return false;});}});};
+jQuery.fn.uniformPatch=function(data){return this.each(function(){var form=jQuery(this);jQuery.each(data.fragments||{},function(id,html){jQuery(document.getElementById(id)).replaceWith(html);});form.find('#errorMsg').remove();if(data.errors){form.find('fieldset, div.ctrlHolder').first().before(data.errors);}});};
+jQuery.fn.uniformRemoteSelect=function(settings){settings=jQuery.extend({delay:250,more_label:'...',search_class:'textInput remoteSearch'},settings);return this.each(function(){var $select=jQuery(this),url=$select.attr('data-choices-url'),page=0,term='',loaded=false,timer,selected=$select.val(),$search=jQuery('<input type="text" class="'+settings.search_class+'" />').insertBefore($select),load=function(next){loaded=true;page=next?page+1:1;jQuery.getJSON(url,{page:page,q:term},function(data){$select.find('option.remoteMore').remove();if(page==1){$select.find('option').not(':selected').not('[value=""]').remove();}
+var values={};$select.find('option').each(function(){values[this.value]=true;});jQuery.each(data.results,function(i,choice){if(!values[choice.value]){jQuery('<option />').val(choice.value).text(choice.label).appendTo($select);}});if(data.more){jQuery('<option value="" class="remoteMore" />').text(settings.more_label).appendTo($select);}});};$select.focus(function(){if(!loaded){load(false);}});$select.change(function(){if($select.find('option.remoteMore:selected').length){$select.val(selected);load(true);}else{selected=$select.val();}});$search.focus(function(){if(!loaded){load(false);}}).keyup(function(){clearTimeout(timer);timer=setTimeout(function(){if($search.val()!=term){term=$search.val();load(false);}},settings.delay);});});};
+jQuery.fn.uniformAddForm=function(prefix){return this.each(function(){var form=jQuery(this),template=document.getElementById(prefix+'-empty-form'),total=form.find('input[name="'+prefix+'-TOTAL_FORMS"]'),max=parseInt(form.find('input[name="'+prefix+'-MAX_NUM_FORMS"]').val(),10),count=parseInt(total.val(),10);if(!template||count>=max||form.find('div.formsetWindow[data-formset-prefix="'+prefix+'"]').length){return;}
+var row=jQuery(jQuery.trim(template.innerHTML.replace(/__prefix__/g,count))).insertBefore(template);total.val(count+1);row.find('select[data-choices-url]').uniformRemoteSelect();form.trigger('uniformFormAdded',[row,count]);});};
+jQuery.fn.uniformFormsetWindow=function(settings){settings=jQuery.extend({margin:300},settings);return this.each(function(){var $marker=jQuery(this),form=$marker.closest('form'),prefix=$marker.attr('data-formset-prefix'),$window=jQuery(window),loading=false,check=function(){if(loading||$marker.offset().top-$window.scrollTop()-$window.height()>settings.margin){return;}
+loading=true;jQuery.getJSON($marker.attr('data-window-url'),{start:$marker.attr('data-window-start')},function(data){$marker.before(data.html);form.find('input[name="'+prefix+'-TOTAL_FORMS"]').val(data.total);form.find('input[name="'+prefix+'-INITIAL_FORMS"]').val(data.initial);form.trigger('uniformWindowLoaded',[data]);if(data.next){$marker.attr('data-window-start',data.next);loading=false;check();}else{$window.unbind('scroll',check);$marker.remove();}});};$window.scroll(check);check();});};
@@ -1,5 +1,7 @@
 from django import template
 
+from uni_form.widgets import render_cached_select, render_cached_widget
+
 register = template.Library()
 
 class_converter = {
@@ -12,8 +14,7 @@ class_converter = {
 def is_checkbox(field):
     return field.field.widget.__class__.__name__.lower() == "checkboxinput"
 
-@register.filter
-def with_class(field):
+def widget_css_class(field):
     class_name = field.field.widget.__class__.__name__.lower()
     class_name = class_converter.get(class_name, class_name)
     if "class" in field.field.widget.attrs:
@@ -22,6 +23,19 @@ def with_class(field):
             css_class += " %s" % (class_name,)
     else:
         css_class = class_name
+    return css_class
+
+@register.filter
+def with_class(field):
+    css_class = widget_css_class(field)
+
+    html = render_cached_select(field, {'class': css_class})
+    if html is not None:
+        return html
+
+    html = render_cached_widget(field, {'class': css_class})
+    if html is not None:
+        return html
 
     return field.as_widget(attrs={'class': css_class})    
 
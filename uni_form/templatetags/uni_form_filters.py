@@ -1,15 +1,33 @@
 # -*- coding: utf-8 -*-
+import logging
+
 from django.conf import settings
 from django.forms.formsets import BaseFormSet
 from django.template import Context
-from django.template.loader import get_template
 from django import template
+from django.utils.safestring import mark_safe
 
+from uni_form import profiling, renderers
+from uni_form.bundles import THEMES, get_bundle, get_inline_css
 from uni_form.helpers import FormHelper
+from uni_form.loader import get_template
+from uni_form.widgets import share_formset_choices
 
 register = template.Library()
 
 
+def is_hidden_form(form):
+    """
+    Tells if `form` has only hidden fields and nothing to report, like the management
+    form of a formset, so it can be rendered without going through the templates.
+    """
+    return not form.visible_fields() and not form.non_field_errors()
+
+
+def render_hidden_form(form):
+    return mark_safe(u''.join([unicode(field) for field in form.hidden_fields()]))
+
+
 @register.filter
 def as_uni_form(form):
     """ The original and still very useful way to generate a form. 
@@ -27,13 +45,21 @@ def as_uni_form(form):
         </form>
         
     """
+    if not isinstance(form, BaseFormSet) and is_hidden_form(form):
+        return render_hidden_form(form)
+
+    record = profiling.begin_render(form)
     if isinstance(form, BaseFormSet):
-        template = get_template('uni_form/uni_formset.html')
+        if getattr(settings, 'UNIFORM_SHARE_FORMSET_CHOICES', True):
+            share_formset_choices(form)
+        template_name = 'uni_form/uni_formset.html'
         c = Context({'formset': form})
     else:
-        template = get_template('uni_form/uni_form.html')
+        template_name = 'uni_form/uni_form.html'
         c = Context({'form': form})
-    return template.render(c)
+    html = renderers.get_active().render(template_name, c)
+    profiling.end_render(record, html)
+    return html
 
 @register.filter
 def as_uni_errors(form):
@@ -47,18 +73,112 @@ def as_uni_errors(form):
 
 @register.filter
 def as_uni_field(field):
-    template = get_template('uni_form/field.html')
-    c = Context({'field':field})
-    return template.render(c)
+    return renderers.get_active().render_field(field)
+
+SETUP_OPTIONS = ('bundled', 'jquery', 'defer', 'async', 'preload', 'inline_css')
+
+
+class UniFormSetupNode(template.Node):
+    def __init__(self, options):
+        self.options = options
+
+    def render(self, context):
+        FAIL_SILENTLY = getattr(settings, 'UNIFORM_FAIL_SILENTLY', True)
 
-@register.inclusion_tag("uni_form/includes.html", takes_context=True)
-def uni_form_setup(context):
+        theme = getattr(settings, 'UNIFORM_THEME', 'default')
+        for option in self.options:
+            if option in THEMES:
+                theme = option
+
+        if 'STATIC_URL' in context:
+            static_url = context['STATIC_URL']
+        else:
+            static_url = settings.STATIC_URL
+        static_url = static_url or ''
+
+        bundle = None
+        if 'bundled' in self.options:
+            bundle = get_bundle(theme)
+            if bundle is None:
+                if not FAIL_SILENTLY:
+                    raise Exception("uni-form bundles for theme '%s' have not been built, run manage.py uni_form_bundle" % theme)
+                logging.warning("uni-form bundles for theme '%s' have not been built, run manage.py uni_form_bundle" % theme)
+
+        # We only load jQuery if asked to, as most pages already have their own
+        jquery = 'jquery' in self.options
+        if bundle:
+            css = [bundle['css']]
+            if jquery and 'js_jquery' in bundle:
+                js = [bundle['js_jquery']]
+            else:
+                js = [bundle['js']]
+                if jquery:
+                    js.insert(0, '%suni_form/jquery.js' % static_url)
+        else:
+            css = ['%suni_form/uni-form.css' % static_url, '%suni_form/%s.uni-form.css' % (static_url, theme)]
+            js = ['%suni_form/uni-form.jquery.js' % static_url]
+            if jquery:
+                js.insert(0, '%suni_form/jquery.js' % static_url)
+
+        setup = {
+            'STATIC_URL': static_url,
+            'uni_form_theme': theme,
+            'uni_form_bundle': bundle,
+            'uni_form_css': css,
+            'uni_form_js': js,
+            'uni_form_inline_css': None,
+            'uni_form_preload': False,
+            'uni_form_script_loading': None,
+        }
+        if 'inline_css' in self.options:
+            setup['uni_form_inline_css'] = mark_safe(get_inline_css(theme))
+        for loading in ('defer', 'async'):
+            if loading in self.options:
+                setup['uni_form_script_loading'] = loading
+        # Async scripts run in the order they load, so the plugin could run before jQuery
+        if setup['uni_form_script_loading'] == 'async' and len(js) > 1:
+            setup['uni_form_script_loading'] = 'defer'
+        # Preloading only helps scripts that aren't run right away
+        setup['uni_form_preload'] = 'preload' in self.options and setup['uni_form_script_loading'] is not None
+
+        context.update(setup)
+        html = get_template("uni_form/includes.html").render(context)
+        context.pop()
+        return html
+
+
+@register.tag(name="uni_form_setup")
+def do_uni_form_setup(parser, token):
     """
     Creates the <style> and <script> tags needed to initialize the uni-form.
 
     Create a local uni-form/includes.html template if you want to customize how
     these files are loaded.
+
+    Options can follow the tag name, in any order:
+
+        * One of the themes, `default`, `blue` or `dark`. Defaults to the `UNIFORM_THEME` 
+          setting or `default`.
+        * `bundled` loads the minified and content hashed bundles built by 
+          `manage.py uni_form_bundle`.
+        * `jquery` also loads the jQuery shipped with uni-form, for pages lacking one.
+        * `defer` or `async` make the script non blocking. `async` becomes `defer` when
+          jQuery is loaded in its own script, as they must run in order.
+        * `preload` adds preload hints for the non blocking scripts.
+        * `inline_css` inlines the minified css in a <style> tag instead of linking it.
+
+    Usage::
+
+        {% uni_form_setup %}
+
+        {% uni_form_setup bundled blue defer preload %}
     """
-    if 'STATIC_URL' not in context:
-        context['STATIC_URL'] = settings.STATIC_URL
-    return (context)
+    options = token.split_contents()
+    tag_name = options.pop(0)
+    for option in options:
+        if option not in THEMES and option not in SETUP_OPTIONS:
+            raise template.TemplateSyntaxError("%s tag got an unknown option '%s'" % (tag_name, option))
+    if 'defer' in options and 'async' in options:
+        raise template.TemplateSyntaxError("%s tag takes either defer or async, not both" % tag_name)
+
+    return UniFormSetupNode(options)
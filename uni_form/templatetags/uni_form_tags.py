@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+from django.conf import settings
 from django.forms.formsets import BaseFormSet
 from django.template import Context
-from django.template.loader import get_template
 from django import template
+from django.utils.safestring import mark_safe
 
-from uni_form.helpers import FormHelper
+from uni_form import budget, profiling, renderers
+from uni_form.helpers import FormHelper, Layout, get_formset_window
+from uni_form.widgets import share_choices
 
 register = template.Library()
 # We import the filters, so they are available when doing load uni_form_tags
@@ -36,39 +39,92 @@ class BasicNode(template.Node):
         else:
             self.helper = None
 
-    def get_render(self, context):
+    def resolve(self, context):
+        """
+        Returns the form or formset and the helper, None if there isn't one, resolving
+        `self.form` and `self.helper` from the `context`.
+        """
+        actual_form = self.form.resolve(context)
+        helper = None
+        if self.helper is not None:
+            helper = self.helper.resolve(context)
+            if not isinstance(helper, FormHelper):
+                raise TypeError('helper object provided to uni_form tag must be a uni_form.helpers.FormHelper object.')
+        return actual_form, helper
+
+    def get_render(self, context, render_budget=None, actual_form=None, helper=None):
         """ 
         Returns a `Context` object with all the necesarry stuff for rendering the form
 
         :param context: `django.template.Context` variable holding the context for the node
 
         `self.form` and `self.helper` are resolved into real Python objects resolving them
-        from the `context`. 
+        from the `context`, unless `actual_form` and `helper` are given already resolved.
         The `actual_form` can be a form or a formset. If it's a formset `is_formset` is set to True.
         If the helper has a layout we use it, for rendering the form or the formset's forms.
+        With a `render_budget`, forms are rendered field by field, so they can degrade once
+        it runs out, and formsets stop rendering forms.
         """
-        actual_form = self.form.resolve(context)
+        if actual_form is None:
+            actual_form, helper = self.resolve(context)
         attrs = {}
-        if self.helper is not None:
-            helper = self.helper.resolve(context)
-
-            if not isinstance(helper, FormHelper):
-                raise TypeError('helper object provided to uni_form tag must be a uni_form.helpers.FormHelper object.')
+        if helper is not None:
             attrs = helper.get_attributes()
-        else:
-            helper = None
 
         # We get the response dictionary 
         is_formset = isinstance(actual_form, BaseFormSet)
         response_dict = self.get_response_dict(attrs, context, is_formset)
 
+        if is_formset:
+            # Only the forms in the first window, if any, are rendered
+            forms, management_form, next_start = get_formset_window(actual_form, 0,
+                attrs.get('formset_window_size'))
+            response_dict.update({
+                'formset_forms': forms,
+                'formset_management_form': management_form,
+                'formset_window_next': next_start,
+                'formset_window_url': attrs.get('formset_window_url', ''),
+            })
+
+            # The empty form is rendered once, as a template for adding forms client side
+            extra_forms = []
+            if attrs.get('formset_empty_form'):
+                response_dict['empty_form'] = actual_form.empty_form
+                extra_forms.append(response_dict['empty_form'])
+
+            # Choices the formset's forms have in common are evaluated and rendered once
+            if getattr(settings, 'UNIFORM_SHARE_FORMSET_CHOICES', True):
+                share_choices(list(forms) + extra_forms)
+
         # If we have a helper's layout we use it, for the form or the formset's form
-        if helper and helper.layout:
+        layout = helper and helper.layout
+        if layout is None and render_budget is not None:
+            if is_formset:
+                layout = Layout(*actual_form.empty_form.fields.keys())
+            else:
+                layout = Layout(*actual_form.fields.keys())
+
+        if layout:
+            form_style = attrs.get('form_style', '')
             if not is_formset:
-                actual_form.form_html = helper.render_layout(actual_form, attrs['form_style'])
+                actual_form.form_html = mark_safe(layout.render(actual_form, form_style))
             else:
-                for form in actual_form.forms:
-                    form.form_html = helper.render_layout(form, attrs['form_style'])
+                for index, form in enumerate(forms):
+                    # Out of budget, the forms left are loaded like the next window if they can be,
+                    # and rendered plainly otherwise
+                    if index and render_budget is not None and render_budget.is_exceeded() and \
+                            not actual_form.is_bound and attrs.get('formset_window_url'):
+                        forms, management_form, next_start = get_formset_window(actual_form, 0, index)
+                        response_dict.update({
+                            'formset_forms': forms,
+                            'formset_management_form': management_form,
+                            'formset_window_next': next_start,
+                        })
+                        break
+                    form.form_html = mark_safe(layout.render(form, form_style))
+
+                for form in extra_forms:
+                    form.form_html = mark_safe(layout.render(form, form_style))
 
         if is_formset:
             response_dict.update({'formset': actual_form})
@@ -109,14 +165,24 @@ class BasicNode(template.Node):
 
 class UniFormNode(BasicNode):
     def render(self, context):
-        c = self.get_render(context)
+        actual_form, helper = self.resolve(context)
+        record = profiling.begin_render(actual_form, helper)
+        render_budget = budget.get_budget(actual_form, helper)
+        renderer = renderers.get_renderer(helper)
+        previous_budget = budget.activate(render_budget)
+        previous_renderer = renderers.activate(renderer)
+        html = None
+        try:
+            c = self.get_render(context, render_budget, actual_form, helper)
+            html = renderer.render_form(c)
+        finally:
+            renderers.deactivate(previous_renderer)
+            budget.deactivate(previous_budget)
+            if record is not None and render_budget is not None:
+                record.degraded = render_budget.exceeded
+            profiling.end_render(record, html)
 
-        if c['is_formset']:
-            template = get_template('uni_form/whole_uni_formset.html')
-        else:
-            template = get_template('uni_form/whole_uni_form.html')
-
-        return template.render(c)
+        return html
 
 
 # {% uni_form %} tag
@@ -147,3 +213,58 @@ def do_uni_form(parser, token):
         helper = None
 
     return UniFormNode(form, helper)
+
+
+class UniFormPartialNode(BasicNode):
+    def __init__(self, form, helper, name):
+        super(UniFormPartialNode, self).__init__(form, helper)
+        self.name = template.Variable(name)
+
+    def render(self, context):
+        actual_form = self.form.resolve(context)
+        if self.helper is not None:
+            helper = self.helper.resolve(context)
+            if not isinstance(helper, FormHelper):
+                raise TypeError('helper object provided to uni_form_partial tag must be a uni_form.helpers.FormHelper object.')
+        else:
+            helper = FormHelper()
+
+        record = profiling.begin_render(actual_form, helper)
+        previous_renderer = renderers.activate(renderers.get_renderer(helper))
+        try:
+            html = helper.render_partial(actual_form, self.name.resolve(context))
+        finally:
+            renderers.deactivate(previous_renderer)
+        profiling.end_render(record, html)
+        return html
+
+
+# {% uni_form_partial %} tag
+@register.tag(name="uni_form_partial")
+def do_uni_form_partial(parser, token):
+    """
+    Renders only one part of a form: a field, or a `Fieldset`, `Row`, `Column` or 
+    `MultiField` of the helper's layout, looked up by its `css_id`. The markup is 
+    the same the `{% uni_form %}` tag outputs for that part, so it can be used for 
+    refreshing fragments of a page.
+
+    Usage::
+
+        {% load uni_form_tags %}
+
+        {% uni_form_partial my_form my_helper "fieldset_id" %}
+
+        {% uni_form_partial my_form "email" %}
+    """
+    token = token.split_contents()
+    tag_name = token.pop(0)
+
+    if len(token) == 2:
+        form, name = token
+        helper = None
+    elif len(token) == 3:
+        form, helper, name = token
+    else:
+        raise template.TemplateSyntaxError("%s tag takes a form, an optional helper and a name" % tag_name)
+
+    return UniFormPartialNode(form, helper, name)
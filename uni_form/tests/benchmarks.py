@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+    Memory benchmarks of large form renders: the peak memory and the blocks
+    allocated rendering big forms through `as_uni_form`, the `{% uni_form %}` tag
+    with a `Layout` and formsets with a helper, broken down by layout object type.
+    Run them with::
+
+        python runtests.py --memory
+
+    The shipped renderers are benchmarked side by side with::
+
+        python runtests.py --memory --renderers
+
+    They need `tracemalloc`, part of Python since 3.4 and available for older
+    versions as the `pytracemalloc` package. Without it, only the growth of the
+    process' peak resident memory is reported. Peaks per layout object type also
+    need `tracemalloc.reset_peak`, from Python 3.9.
+
+"""
+import gc
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from django import forms
+from django.conf import settings
+from django.forms.formsets import formset_factory
+from django.template import Context, Template
+
+from uni_form import helpers
+from uni_form.helpers import FormHelper, Layout, Fieldset, MultiField, Row, Column, HTML
+
+LAYOUT_TYPES = (Layout, Fieldset, MultiField, Row, Column, HTML)
+
+RENDERERS = ('uni_form.renderers.TemplateRenderer', 'uni_form.renderers.CompiledRenderer',
+    'uni_form.renderers.PythonRenderer', 'uni_form.renderers.SkeletonRenderer')
+
+
+def make_form_class(fields=60, choices=100):
+    """
+    Returns a form class with `fields` fields of several types, selects having `choices`
+    choices each.
+    """
+    attrs = {}
+    choice_list = [(i, 'Choice %s' % i) for i in range(choices)]
+    for i in range(fields):
+        kind = i % 4
+        if kind == 0:
+            field = forms.CharField(label='Text %s' % i, max_length=50, help_text='Help %s' % i)
+        elif kind == 1:
+            field = forms.ChoiceField(label='Select %s' % i, choices=choice_list)
+        elif kind == 2:
+            field = forms.BooleanField(label='Check %s' % i, required=False)
+        else:
+            field = forms.CharField(label='Notes %s' % i, widget=forms.Textarea(), required=False)
+        attrs['field_%03d' % i] = field
+    return type('BigForm', (forms.Form,), attrs)
+
+
+def make_layout(form_class):
+    """
+    Returns a layout of `form_class` grouping its fields in fieldsets, rows, columns
+    and multifields.
+    """
+    names = sorted(form_class.base_fields.keys())
+    fieldsets = []
+    for start in range(0, len(names), 12):
+        group = names[start:start + 12]
+        fieldsets.append(Fieldset('Group %s' % start,
+            Row(*group[0:3]), Column(*group[3:6]), MultiField('Multi %s' % start, *group[6:9]),
+            HTML('<hr />'), *group[9:]))
+    return Layout(*fieldsets)
+
+
+def get_benchmarks(fields=60, forms_count=50):
+    form_class = make_form_class(fields)
+    helper = FormHelper()
+    helper.add_layout(make_layout(form_class))
+
+    small_class = make_form_class(fields / 6)
+    formset_class = formset_factory(small_class, extra=forms_count)
+    formset_helper = FormHelper()
+    formset_helper.add_layout(make_layout(small_class))
+
+    return (
+        ('as_uni_form', u"{% load uni_form_tags %}{{ form|as_uni_form }}",
+            lambda: {'form': form_class()}),
+        ('uni_form layout', u"{% load uni_form_tags %}{% uni_form form helper %}",
+            lambda: {'form': form_class(), 'helper': helper}),
+        ('formset helper', u"{% load uni_form_tags %}{% uni_form formset helper %}",
+            lambda: {'formset': formset_class(), 'helper': formset_helper}),
+    )
+
+
+class LayoutTracer(object):
+    """
+    Wraps the `render` of the layout objects and `render_field`, accounting the memory
+    allocated and the peak reached while rendering every type, children included.
+
+    tracemalloc only keeps one peak, so it's reset when every call starts, and the peak
+    each call reached is handed to the call it's nested in. Without `reset_peak` only
+    the allocated memory is accounted.
+    """
+    def __init__(self):
+        self.stats = {}
+        self.originals = []
+        self.peaks = []
+        self.has_peaks = hasattr(tracemalloc, 'reset_peak')
+
+    def begin(self):
+        """
+        Starts accounting a call. Returns the memory traced when it starts.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if self.has_peaks:
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self.peaks.append(current)
+        return current
+
+    def end(self):
+        """
+        Ends accounting a call. Returns the memory traced and the peak reached during the
+        call, None without `reset_peak`.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if not self.has_peaks:
+            return current, None
+
+        peak = max(self.peaks.pop(), peak)
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        return current, peak
+
+    def record(self, name, function):
+        def traced(*args, **kwargs):
+            start = self.begin()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                current, peak = self.end()
+                stats = self.stats.setdefault(name, {'calls': 0, 'allocated': 0, 'peak': None})
+                stats['calls'] += 1
+                stats['allocated'] += current - start
+                if peak is not None:
+                    stats['peak'] = max(stats['peak'] or 0, peak - start)
+        return traced
+
+    def install(self):
+        for layout_type in LAYOUT_TYPES:
+            self.originals.append((layout_type, 'render', layout_type.__dict__['render']))
+            layout_type.render = self.record(layout_type.__name__, layout_type.__dict__['render'])
+
+        render_field = helpers.render_field
+        self.originals.append((helpers, 'render_field', render_field))
+        traced_field = self.record('field', render_field)
+        helpers.render_field = lambda field, *args, **kwargs: (isinstance(field, basestring) and
+            traced_field or render_field)(field, *args, **kwargs)
+
+    def uninstall(self):
+        for owner, name, original in self.originals:
+            setattr(owner, name, original)
+        self.originals = []
+
+
+def measure(source, get_context):
+    """
+    Renders once to warm up and once measuring. Returns a dictionary with the render
+    `time`, its `peak` memory and the memory `allocated` and `blocks` still alive at
+    its end, in bytes, the peak resident memory growth `maxrss`, and the `layout`
+    breakdown per type.
+    """
+    template = Template(source)
+    template.render(Context(get_context()))
+    context = Context(get_context())
+    gc.collect()
+
+    result = {'maxrss': None, 'peak': None, 'allocated': None, 'blocks': None, 'layout': {}}
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if tracemalloc is not None:
+        tracer = LayoutTracer()
+        tracer.install()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start_memory = tracer.begin()
+
+    start = time.time()
+    html = template.render(context)
+    result['time'] = time.time() - start
+
+    if tracemalloc is not None:
+        current, peak = tracer.end()
+        if peak is None:
+            peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        tracer.uninstall()
+        result['peak'] = peak - start_memory
+        result['allocated'] = current - start_memory
+        result['blocks'] = sum([stat.count_diff for stat in after.compare_to(before, 'filename')])
+        result['layout'] = tracer.stats
+
+    if resource is not None:
+        result['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - maxrss
+    result['size'] = len(html)
+    return result
+
+
+def format_bytes(value):
+    if value is None:
+        return '-'
+    return '%.1fKB' % (value / 1024.0)
+
+
+def run(fields=60, forms_count=50, stream=None):
+    """
+    Runs every benchmark, writing a report to `stream` if given. Returns a list of
+    tuples with every benchmark's name and result.
+    """
+    results = [(name, measure(source, get_context)) for name, source, get_context
+        in get_benchmarks(fields, forms_count)]
+
+    if stream is not None:
+        if tracemalloc is None:
+            stream.write("tracemalloc is not available, install pytracemalloc or use Python 3.4+ for allocation tracing\n")
+        for name, result in results:
+            stream.write("%s: time=%.1fms size=%s peak=%s allocated=%s blocks=%s maxrss_growth=%s\n" % (name,
+                result['time'] * 1000, format_bytes(result['size']), format_bytes(result['peak']),
+                format_bytes(result['allocated']), result['blocks'] is None and '-' or result['blocks'],
+                result['maxrss'] is None and '-' or '%dKB' % result['maxrss']))
+            for layout_name, stats in sorted(result['layout'].items()):
+                stream.write("    %s: calls=%d allocated=%s peak=%s\n" % (layout_name, stats['calls'],
+                    format_bytes(stats['allocated']), format_bytes(stats['peak'])))
+
+    return results
+
+
+def compare_renderers(renderers=RENDERERS, fields=60, forms_count=50, stream=None):
+    """
+    Runs every benchmark with each of `renderers`, dotted paths set as the
+    `UNIFORM_RENDERER` setting. Returns a list of tuples with every renderer and the
+    results of `run` with it.
+    """
+    missing = object()
+    previous = getattr(settings, 'UNIFORM_RENDERER', missing)
+    results = []
+    try:
+        for renderer in renderers:
+            settings.UNIFORM_RENDERER = renderer
+            if stream is not None:
+                stream.write("%s\n" % renderer)
+            results.append((renderer, run(fields, forms_count, stream)))
+    finally:
+        if previous is missing:
+            del settings.UNIFORM_RENDERER
+        else:
+            settings.UNIFORM_RENDERER = previous
+    return results
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+    Golden output and performance harness: a corpus of forms rendered in every
+    way uni_form supports, checked against the html stored in `golden/` and the
+    template counts stored in `golden/baselines.json`.
+
+    After a change meant to alter the markup or the performance, review the
+    differences and store the new output and baselines with::
+
+        python runtests.py --update-golden
+
+    Render times depend on the machine, so they are only checked against the
+    baselines, stored on the same machine, with::
+
+        python runtests.py --perf
+
+"""
+import os
+import re
+import time
+
+from django import forms
+from django.forms.formsets import formset_factory
+from django.template import Context, Template
+from django.utils import simplejson
+
+from uni_form import loader, profiling
+from uni_form.helpers import FormHelper, Submit, Reset, Hidden, Button
+from uni_form.helpers import Layout, Fieldset, MultiField, Row, Column, HTML
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+BASELINES = os.path.join(GOLDEN_DIR, 'baselines.json')
+
+# Renders timed per case, keeping the fastest
+TIMING_RUNS = 5
+
+# Render time allowed relative to the baseline, plus an absolute slack in seconds for
+# the noise of tiny renders. Override the factor with UNIFORM_PERF_TOLERANCE.
+TIME_TOLERANCE = float(os.environ.get('UNIFORM_PERF_TOLERANCE', 3))
+TIME_SLACK = 0.005
+
+
+class WidgetsForm(forms.Form):
+    text = forms.CharField(label="text", max_length=30, help_text="Some help")
+    email = forms.EmailField(label="email", required=False)
+    password = forms.CharField(label="password", widget=forms.PasswordInput())
+    notes = forms.CharField(label="notes", widget=forms.Textarea(), required=False)
+    hidden = forms.CharField(widget=forms.HiddenInput(), required=False)
+    agree = forms.BooleanField(label="agree", required=False)
+    number = forms.IntegerField(label="number", required=False)
+    date = forms.DateField(label="date", required=False)
+    when = forms.SplitDateTimeField(label="when", required=False)
+    select = forms.ChoiceField(label="select", choices=(('a', 'A & a'), ('b', 'B')))
+    multiple = forms.MultipleChoiceField(label="multiple", required=False,
+        choices=(('Group', (('c', 'C'), ('d', 'D'))), ('e', 'E')))
+    radio = forms.ChoiceField(label="radio", widget=forms.RadioSelect(), choices=(('x', 'X'), ('y', 'Y')))
+    checkboxes = forms.MultipleChoiceField(label="checkboxes", widget=forms.CheckboxSelectMultiple(),
+        choices=(('1', 'One'), ('2', 'Two')), required=False)
+    upload = forms.FileField(label="upload", required=False)
+
+    def clean(self):
+        if self.cleaned_data.get('select') == 'b':
+            raise forms.ValidationError("B is not <allowed>")
+        return self.cleaned_data
+
+
+INVALID_DATA = {'text': '', 'email': 'nope', 'number': 'one', 'select': 'b', 'radio': 'z', 'hidden': 'h'}
+
+WidgetsFormSet = formset_factory(WidgetsForm, extra=2)
+
+
+def layout_helper(form_style='default'):
+    helper = FormHelper()
+    helper.form_id = 'golden'
+    helper.form_class = 'goldenForm'
+    helper.form_style = form_style
+    helper.form_error_title = 'Form errors'
+    helper.add_layout(Layout(
+        Fieldset('Account', 'text', 'email', Row('password', 'hidden'), css_class='account'),
+        Fieldset('More', Column('notes', 'agree', css_id='column_more'), HTML('<p>{{ form.number.label }}</p>'),
+            MultiField('Dates', 'date', 'when')),
+        'select',
+    ))
+    helper.add_input(Submit('save', 'Save'))
+    helper.add_input(Reset('reset', 'Reset'))
+    helper.add_input(Hidden('next', '/next/'))
+    helper.add_input(Button('cancel', 'Cancel'))
+    return helper
+
+
+def formset_helper():
+    helper = FormHelper()
+    helper.form_method = 'GET'
+    helper.formset_error_title = 'Formset errors'
+    return helper
+
+
+# Every case is a name, a template and a function returning its context
+CASES = (
+    ('filter', u"{% load uni_form_tags %}{{ form|as_uni_form }}",
+        lambda: {'form': WidgetsForm()}),
+    ('filter_errors', u"{% load uni_form_tags %}{{ form|as_uni_errors }}{{ form|as_uni_form }}",
+        lambda: {'form': WidgetsForm(INVALID_DATA)}),
+    ('tag', u"{% load uni_form_tags %}{% uni_form form %}",
+        lambda: {'form': WidgetsForm(), 'csrf_token': 'golden'}),
+    ('tag_errors', u"{% load uni_form_tags %}{% uni_form form helper %}",
+        lambda: {'form': WidgetsForm(INVALID_DATA), 'helper': FormHelper(), 'csrf_token': 'golden'}),
+    ('layout', u"{% load uni_form_tags %}{% uni_form form helper %}",
+        lambda: {'form': WidgetsForm(), 'helper': layout_helper(), 'csrf_token': 'golden'}),
+    ('layout_errors', u"{% load uni_form_tags %}{% uni_form form helper %}",
+        lambda: {'form': WidgetsForm(INVALID_DATA), 'helper': layout_helper(), 'csrf_token': 'golden'}),
+    ('layout_inline', u"{% load uni_form_tags %}{% uni_form form helper %}",
+        lambda: {'form': WidgetsForm(), 'helper': layout_helper('inline'), 'csrf_token': 'golden'}),
+    ('partial', u"{% load uni_form_tags %}{% uni_form_partial form helper 'column_more' %}",
+        lambda: {'form': WidgetsForm(), 'helper': layout_helper()}),
+    ('formset', u"{% load uni_form_tags %}{% uni_form formset helper %}",
+        lambda: {'formset': WidgetsFormSet(), 'helper': formset_helper()}),
+    ('formset_filter', u"{% load uni_form_tags %}{{ formset|as_uni_form }}",
+        lambda: {'formset': WidgetsFormSet()}),
+    ('formset_errors', u"{% load uni_form_tags %}{% uni_form formset helper %}",
+        lambda: {'formset': WidgetsFormSet(dict([('form-TOTAL_FORMS', '2'), ('form-INITIAL_FORMS', '0')] +
+            [('form-0-%s' % name, value) for name, value in INVALID_DATA.items()])), 'helper': formset_helper()}),
+    ('formset_layout', u"{% load uni_form_tags %}{% uni_form formset helper %}",
+        lambda: {'formset': WidgetsFormSet(), 'helper': layout_helper(), 'csrf_token': 'golden'}),
+)
+
+
+def normalize(html):
+    """
+    Removes the whitespace that makes no difference to browsers, so renders only
+    differing in indentation or blank lines compare equal.
+    """
+    html = re.sub(r'>\s+<', '><', html.strip())
+    return re.sub(r'\s+', ' ', html)
+
+
+class RenderCounter(object):
+    """
+    Counts the Django templates rendered, included ones too, while installed.
+    """
+    def __init__(self):
+        self.renders = 0
+        self.original = None
+
+    def install(self):
+        self.original = Template.__dict__['_render']
+        original = self.original
+
+        def counted(template, context):
+            self.renders += 1
+            return original(template, context)
+        Template._render = counted
+
+    def uninstall(self):
+        Template._render = self.original
+
+
+def render_case(case):
+    """
+    Renders `case` with the templates compiled from scratch. Returns its html and a
+    dictionary with the templates loaded, the templates rendered, includes included,
+    the `render_to_string` calls and the fastest render `time` of a few.
+    """
+    name, source, get_context = case
+    template = Template(source)
+
+    loader.clear_cache()
+    counter = RenderCounter()
+    counter.install()
+    profiling.start_recording()
+    try:
+        html = template.render(Context(get_context()))
+    finally:
+        records = profiling.stop_recording()
+        counter.uninstall()
+
+    times = []
+    for run in range(TIMING_RUNS):
+        context = Context(get_context())
+        start = time.time()
+        template.render(context)
+        times.append(time.time() - start)
+
+    counts = {
+        'templates': sum([record.templates for record in records]),
+        'renders': counter.renders,
+        'render_to_string': sum([record.render_to_string for record in records]),
+        'time': min(times),
+    }
+    return html, counts
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, '%s.html' % name)
+
+
+def read_golden(name):
+    golden_file = open(golden_path(name))
+    try:
+        return golden_file.read().decode('utf-8')
+    finally:
+        golden_file.close()
+
+
+def read_baselines():
+    baselines_file = open(BASELINES)
+    try:
+        return simplejson.loads(baselines_file.read())
+    finally:
+        baselines_file.close()
+
+
+def check_case(case, baselines, timing=False):
+    """
+    Returns a list of the problems found rendering `case`: output differing from its
+    golden html, more templates loaded or rendered or `render_to_string` calls than its
+    baseline, or with `timing`, a render slower than its baseline allows.
+    """
+    name = case[0]
+    html, counts = render_case(case)
+    problems = []
+
+    if normalize(html) != normalize(read_golden(name)):
+        problems.append("'%s' renders differently from %s" % (name, golden_path(name)))
+
+    baseline = baselines[name]
+    for count in ('templates', 'renders', 'render_to_string'):
+        if counts[count] > baseline[count]:
+            problems.append("'%s' takes %d %s, its baseline is %d" % (name, counts[count], count, baseline[count]))
+
+    allowed = baseline['time'] * TIME_TOLERANCE + TIME_SLACK
+    if timing and counts['time'] > allowed:
+        problems.append("'%s' renders in %.2fms, more than the %.2fms allowed" % (name, counts['time'] * 1000, allowed * 1000))
+
+    return problems
+
+
+def update():
+    """
+    Renders every case and stores its output and baselines.
+    """
+    if not os.path.isdir(GOLDEN_DIR):
+        os.makedirs(GOLDEN_DIR)
+
+    baselines = {}
+    for case in CASES:
+        html, baselines[case[0]] = render_case(case)
+        golden_file = open(golden_path(case[0]), 'w')
+        try:
+            golden_file.write(html.encode('utf-8'))
+        finally:
+            golden_file.close()
+
+    baselines_file = open(BASELINES, 'w')
+    try:
+        baselines_file.write(simplejson.dumps(baselines, indent=4, sort_keys=True))
+    finally:
+        baselines_file.close()
+
+
+def check_performance(stream):
+    """
+    Checks every case, render times included, writing the problems found to `stream`.
+    Returns whether there were none.
+    """
+    baselines = read_baselines()
+    problems = []
+    for case in CASES:
+        problems.extend(check_case(case, baselines, timing=True))
+    for problem in problems:
+        stream.write("%s\n" % problem)
+    return not problems
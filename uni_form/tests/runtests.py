@@ -16,7 +16,35 @@ def runtests():
         'uni_form.TestBasicFunctionalityTags',
         'uni_form.TestFormHelpers',
         'uni_form.TestFormLayout',
+        'uni_form.TestGoldenOutput',
+        'uni_form.TestProfiling',
+        'uni_form.TestViews',
+        'uni_form.TestWarmUp',
+        'uni_form.TestWidgets',
         ], verbosity=1, interactive=True)
 
+def update_golden():
+    from uni_form.tests import golden
+    golden.update()
+
+def check_performance():
+    from uni_form.tests import golden
+    if not golden.check_performance(sys.stdout):
+        sys.exit(1)
+
+def run_memory_benchmarks():
+    from uni_form.tests import benchmarks
+    if '--renderers' in sys.argv:
+        benchmarks.compare_renderers(stream=sys.stdout)
+    else:
+        benchmarks.run(stream=sys.stdout)
+
 if __name__ == '__main__':
-    runtests()
+    if '--update-golden' in sys.argv:
+        update_golden()
+    elif '--perf' in sys.argv:
+        check_performance()
+    elif '--memory' in sys.argv:
+        run_memory_benchmarks()
+    else:
+        runtests()
@@ -1,15 +1,35 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
 from django import forms
 from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
-from django.template import Context, Template, TemplateSyntaxError
-from django.template.loader import get_template_from_string
+from django.template import Context, Template, TemplateDoesNotExist, TemplateSyntaxError
+from django.http import Http404
+from django.template.loader import BaseLoader, get_template_from_string
 from django.template.loader import render_to_string
 from django.middleware.csrf import _get_new_csrf_key
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.utils import simplejson, unittest
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
 
 from uni_form.helpers import FormHelper, FormHelpersException, Submit, Reset, Hidden, Button
 from uni_form.helpers import Layout, Fieldset, MultiField, Row, Column, HTML
+from uni_form.templatetags.uni_form_filters import as_uni_form
+from uni_form.views import choices_json, formset_window_response, fragments_response
+from uni_form import loader, profiling, warmup
+from uni_form.widgets import choices_cache, widgets_cache, RemoteSelect, RemoteSelectMultiple
 
 
 class TestForm(forms.Form):
@@ -29,6 +49,31 @@ class TestForm(forms.Form):
 
         return self.cleaned_data
 
+class ChoicesForm(forms.Form):
+    choice = forms.ChoiceField(choices=[(i, 'Option <%s>' % i) for i in range(1000)])
+    choices = forms.MultipleChoiceField(choices=(('Group', (('a', 'A'), ('b', 'B'))), ('c', 'C')))
+    group = forms.ModelChoiceField(queryset=Group.objects.all(), required=False)
+
+
+class RemoteChoicesForm(forms.Form):
+    choice = forms.ChoiceField(choices=[('', '---')] + [(i, 'Option %s' % i) for i in range(120)],
+        widget=RemoteSelect(url='/choices/choice/'))
+    groups = forms.ModelMultipleChoiceField(queryset=Group.objects.all(), required=False,
+        widget=RemoteSelectMultiple(url='/groups/'))
+
+
+class CompiledOnlyLoader(BaseLoader):
+    """
+    A template loader only loading compiled templates, not their source.
+    """
+    is_usable = True
+
+    def load_template(self, template_name, template_dirs=None):
+        if template_name == 'uni_form/compiled_only.html':
+            return Template(u"<em>{{ label }}</em>"), None
+        raise TemplateDoesNotExist(template_name)
+
+
 class TestBasicFunctionalityTags(TestCase):
     def setUp(self):
         pass
@@ -73,6 +118,46 @@ class TestBasicFunctionalityTags(TestCase):
         self.assertTrue("<td>" not in html)
         self.assertTrue("id_is_company" in html)
     
+    def test_as_uni_form_hidden_form(self):
+        from django.forms.formsets import formset_factory
+        management_form = formset_factory(TestForm)().management_form
+        html = as_uni_form(management_form)
+        self.assertEqual(html, u''.join([unicode(field) for field in management_form]))
+        self.assertTrue('name="form-TOTAL_FORMS"' in html)
+        self.assertFalse('ctrlHolder' in html)
+
+        class HiddenForm(forms.Form):
+            token = forms.CharField(widget=forms.HiddenInput)
+
+            def clean(self):
+                raise forms.ValidationError('Expired token')
+
+        html = as_uni_form(HiddenForm({'token': 'a'}))
+        self.assertTrue('errorMsg' in html)
+        self.assertTrue('Expired token' in html)
+
+    @unittest.skipIf(jinja2 is None, "Jinja2 isn't installed")
+    def test_jinja2(self):
+        from uni_form.jinja import install
+        environment = jinja2.Environment(autoescape=True)
+        install(environment)
+        template = environment.from_string(u"<div>{{ form|as_uni_form }}</div>{{ uni_form(form, helper, 'token') }}")
+        html = template.render(form=TestForm(), helper=FormHelper())
+        self.assertEqual(html.count('id="div_id_email"'), 2)
+        self.assertTrue("name='csrfmiddlewaretoken' value='token'" in html)
+        self.assertFalse('&lt;' in html)
+
+        setup = get_template_from_string(u"{% load uni_form_tags %}{% uni_form_setup %}")
+        django_html = setup.render(Context())
+        settings.UNIFORM_TEMPLATE_ENGINE = 'jinja2'
+        jinja_html = setup.render(Context())
+        del settings.UNIFORM_TEMPLATE_ENGINE
+        self.assertEqual(jinja_html.strip(), django_html.strip())
+
+        settings.UNIFORM_TEMPLATE_ENGINE = 'mako'
+        self.assertRaises(ImproperlyConfigured, lambda: as_uni_form(TestForm()))
+        del settings.UNIFORM_TEMPLATE_ENGINE
+
     def test_uni_form_setup(self):
         template = get_template_from_string("""
             {% load uni_form_tags %}
@@ -86,6 +171,90 @@ class TestBasicFunctionalityTags(TestCase):
         self.assertTrue('uni-form.css' in html)
         self.assertTrue('uni-form.jquery.js' in html)
 
+    def test_uni_form_setup_bundled(self):
+        bundle_root = tempfile.mkdtemp()
+        settings.UNIFORM_BUNDLE_ROOT = bundle_root
+        settings.UNIFORM_BUNDLE_URL = '/static/bundles/'
+        try:
+            call_command('uni_form_bundle', themes=['blue'], stdout=StringIO())
+
+            filenames = os.listdir(bundle_root)
+            self.assertEqual(len(filenames), 3)
+            self.assertTrue('manifest.json' in filenames)
+
+            template = get_template_from_string("""
+                {% load uni_form_tags %}
+                {% uni_form_setup bundled blue %}
+            """)
+            html = template.render(Context())
+            self.assertEqual(html.count('<link'), 1)
+            self.assertEqual(html.count('<script'), 1)
+            for filename in filenames:
+                if filename != 'manifest.json':
+                    self.assertTrue('/static/bundles/%s' % filename in html)
+
+            css = open(os.path.join(bundle_root, [f for f in filenames if f.endswith('.css')][0])).read()
+            self.assertFalse('/*' in css)
+            self.assertFalse('\n\n' in css)
+        finally:
+            del settings.UNIFORM_BUNDLE_ROOT
+            del settings.UNIFORM_BUNDLE_URL
+            shutil.rmtree(bundle_root)
+
+    def test_uni_form_setup_loading_options(self):
+        template = get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup defer preload jquery %}
+        """)
+        html = template.render(Context({'STATIC_URL': '/static/'}))
+        self.assertEqual(html.count('defer="defer"'), 2)
+        self.assertTrue('<script src="/static/uni_form/jquery.js"' in html)
+        self.assertTrue('<link rel="preload" href="/static/uni_form/uni-form.jquery.js" as="script" />' in html)
+        self.assertFalse('as="style"' in html)
+        self.assertTrue('<link rel="stylesheet" href="/static/uni_form/uni-form.css"' in html)
+
+        # jQuery and the plugin must run in order
+        template = get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup async jquery %}
+        """)
+        html = template.render(Context({'STATIC_URL': '/static/'}))
+        self.assertEqual(html.count('defer="defer"'), 2)
+        self.assertFalse('async' in html)
+
+        # Blocking scripts gain nothing from preloading
+        template = get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup preload %}
+        """)
+        self.assertFalse('rel="preload"' in template.render(Context({'STATIC_URL': '/static/'})))
+
+        template = get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup async inline_css %}
+        """)
+        html = template.render(Context({'STATIC_URL': '/static/'}))
+        self.assertTrue('async="async"' in html)
+        self.assertFalse('/uni_form/jquery.js' in html)
+        self.assertFalse('<link' in html)
+        self.assertTrue('<style type="text/css">' in html)
+        self.assertTrue('.uniForm' in html)
+        self.assertFalse('/*' in html)
+
+        self.assertRaises(TemplateSyntaxError, lambda: get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup async defer %}
+        """))
+
+    def test_uni_form_setup_theme(self):
+        template = get_template_from_string("""
+            {% load uni_form_tags %}
+            {% uni_form_setup dark %}
+        """)
+        html = template.render(Context())
+        self.assertTrue('dark.uni-form.css' in html)
+        self.assertFalse('default.uni-form.css' in html)
+
 class TestFormHelpers(TestCase):
     urls = 'uni_form.tests.urls'
     def setUp(self):
@@ -225,6 +394,112 @@ class TestFormHelpers(TestCase):
         self.assertTrue('id="thisFormsetRocks">' in html)
         self.assertTrue('action="%s"' % reverse('simpleAction') in html)
 
+    def test_uni_form_formset_empty_form(self):
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form testFormSet formset_helper %}
+        """)
+
+        form_helper = FormHelper()
+        from django.forms.formsets import formset_factory
+        TestFormSet = formset_factory(TestForm, extra = 0)
+        c = Context({'testFormSet': TestFormSet(), 'formset_helper': form_helper})
+        self.assertFalse('<template' in template.render(c))
+
+        form_helper.formset_empty_form = True
+        html = template.render(c)
+        self.assertEqual(html.count('<template id="form-empty-form" class="emptyForm">'), 1)
+        self.assertTrue('id="div_id_form-__prefix__-email"' in html)
+        self.assertTrue('name="form-__prefix__-email"' in html)
+        self.assertFalse('name="form-0-email"' in html)
+
+        form_helper.add_layout(Layout(Fieldset('Company', 'is_company')))
+        html = template.render(c)
+        self.assertEqual(html.count('<legend>Company</legend>'), 1)
+        self.assertTrue('<template' in html.split('<legend>')[0])
+
+    def test_uni_form_formset_window(self):
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form testFormSet formset_helper %}
+        """)
+
+        form_helper = FormHelper()
+        form_helper.formset_window_size = 4
+        form_helper.formset_window_url = 'simpleAction'
+        from django.forms.formsets import formset_factory
+        TestFormSet = formset_factory(TestForm, extra = 10)
+        html = template.render(Context({'testFormSet': TestFormSet(), 'formset_helper': form_helper}))
+
+        self.assertEqual(html.count('name="form-'), 4 * len(TestForm.base_fields) + 3)
+        self.assertTrue('name="form-3-email"' in html)
+        self.assertFalse('name="form-4-email"' in html)
+        self.assertTrue('<input type="hidden" name="form-TOTAL_FORMS" value="4" id="id_form-TOTAL_FORMS" />' in html)
+        self.assertTrue('<input type="hidden" name="form-INITIAL_FORMS" value="0" id="id_form-INITIAL_FORMS" />' in html)
+        self.assertTrue('data-window-url="%s" data-window-start="4"' % reverse('simpleAction') in html)
+
+        # Bound formsets hold only the forms submitted, they are never windowed
+        data = {'form-TOTAL_FORMS': '6', 'form-INITIAL_FORMS': '0'}
+        html = template.render(Context({'testFormSet': TestFormSet(data), 'formset_helper': form_helper}))
+        self.assertTrue('name="form-0-email"' in html)
+        self.assertTrue('name="form-5-email"' in html)
+
+    def test_renderer(self):
+        from uni_form.renderers import TemplateRenderer
+
+        class RecordingRenderer(TemplateRenderer):
+            def __init__(self):
+                self.fields = []
+
+            def render_field(self, bound_field, template='uni_form/field.html', labelclass=None):
+                self.fields.append(bound_field.name)
+                return super(RecordingRenderer, self).render_field(bound_field, template, labelclass)
+
+        form_helper = FormHelper()
+        form_helper.renderer = RecordingRenderer()
+        form_helper.add_layout(Layout(Fieldset('Account', 'email', Row('password1', 'password2'))))
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+        """)
+        html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+        self.assertEqual(form_helper.renderer.fields[:3], ['email', 'password1', 'password2'])
+        self.assertTrue('id="div_id_first_name"' in html)
+
+        # Forms without a layout have their fields rendered by the renderer too
+        from uni_form.renderers import PythonRenderer
+
+        class RecordingPythonRenderer(PythonRenderer):
+            def render_field(self, bound_field, template='uni_form/field.html', labelclass=None):
+                self.fields.append(bound_field.name)
+                return super(RecordingPythonRenderer, self).render_field(bound_field, template, labelclass)
+
+        form_helper = FormHelper()
+        form_helper.renderer = RecordingPythonRenderer()
+        form_helper.renderer.fields = []
+        html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+        self.assertEqual(form_helper.renderer.fields, TestForm.base_fields.keys())
+        self.assertEqual(html.count('<div id="div_id_'), len(TestForm.base_fields))
+
+        settings.UNIFORM_RENDERER = 'uni_form.renderers.NoSuchRenderer'
+        try:
+            self.assertRaises(ImproperlyConfigured, template.render,
+                Context({'form': TestForm(), 'form_helper': FormHelper()}))
+        finally:
+            del settings.UNIFORM_RENDERER
+
+    def test_nested_renderers(self):
+        from uni_form import renderers
+        from uni_form.renderers import PythonRenderer, TemplateRenderer
+        outer = PythonRenderer()
+        previous = renderers.activate(outer)
+        inner_previous = renderers.activate(TemplateRenderer())
+        self.assertTrue(inner_previous is outer)
+        renderers.deactivate(inner_previous)
+        self.assertTrue(renderers.get_active() is outer)
+        renderers.deactivate(previous)
+        self.assertTrue(type(renderers.get_active()) is TemplateRenderer)
+
     def test_CSRF_token_POST_form(self):
         form_helper = FormHelper()    
         template = get_template_from_string(u"""
@@ -416,3 +691,846 @@ class TestFormLayout(TestCase):
         c = Context({'form': form, 'form_helper': form_helper})
         html = template.render(c)
         self.assertFalse('email' in html)
+
+    def test_render_partial(self):
+        form_helper = FormHelper()
+        form_helper.add_layout(
+            Layout(
+                Fieldset(
+                    u'Company Data',
+                    'is_company',
+                    css_id = "fieldset_company_data",
+                ),
+                Fieldset(
+                    u'User Data',
+                    'email',
+                    Row(
+                        'password1',
+                        'password2',
+                        css_id = "row_passwords",
+                    ),
+                    'first_name',
+                    'last_name',
+                )
+            )
+        )
+        form = TestForm()
+
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+        """)
+        whole_html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+
+        fieldset_html = form_helper.render_partial(form, 'fieldset_company_data')
+        self.assertTrue(fieldset_html.startswith('<fieldset id="fieldset_company_data"'))
+        self.assertTrue('id_is_company' in fieldset_html)
+        self.assertFalse('id_email' in fieldset_html)
+        self.assertTrue(fieldset_html in whole_html)
+
+        row_html = form_helper.render_partial(form, 'row_passwords')
+        self.assertTrue('id_password1' in row_html)
+        self.assertTrue(row_html in whole_html)
+
+        field_html = form_helper.render_partial(form, 'email')
+        self.assertTrue('id="div_id_email"' in field_html)
+        self.assertFalse('id_first_name' in field_html)
+
+        # Rendering parts doesn't mark fields as rendered for a later full render
+        self.assertFalse(hasattr(form, 'rendered_fields'))
+        self.assertRaises(FormHelpersException, lambda: form_helper.render_partial(form, 'typo'))
+
+    def test_uni_form_partial_tag(self):
+        form_helper = FormHelper()
+        form_helper.add_layout(
+            Layout(
+                Fieldset(u'Company Data', 'is_company', css_id = "fieldset_company_data"),
+                Fieldset(u'User Data', 'email', 'first_name', css_id = "fieldset_user_data"),
+            )
+        )
+
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form_partial form form_helper "fieldset_user_data" %}
+        """)
+        html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+        self.assertTrue('id="fieldset_user_data"' in html)
+        self.assertTrue('id_first_name' in html)
+        self.assertFalse('id_is_company' in html)
+        self.assertFalse('<form' in html)
+
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form_partial form "last_name" %}
+        """)
+        html = template.render(Context({'form': TestForm()}))
+        self.assertTrue('id="div_id_last_name"' in html)
+        self.assertFalse('id_email' in html)
+
+    def test_lazy_translations(self):
+        from django.utils import translation as django_translation
+        from django.utils.translation import trans_real, ugettext_lazy
+        from uni_form import translation
+
+        legend = ugettext_lazy('This field is required.')
+        form_helper = FormHelper()
+        form_helper.form_error_title = legend
+        form_helper.add_layout(Layout(Fieldset(legend, 'email'), MultiField(legend, 'first_name')))
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+        """)
+
+        translations = trans_real._translations
+        translation.clear_cache()
+        html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+        self.assertTrue('<legend>This field is required.</legend>' in html)
+        self.assertTrue('<p class="label">This field is required.</p>' in html)
+        self.assertEqual(form_helper.get_attributes()['form_error_title'], u'This field is required.')
+        self.assertEqual(len(translation.texts_cache), 1)
+
+        django_translation.activate('es')
+        try:
+            html = template.render(Context({'form': TestForm(), 'form_helper': form_helper}))
+            self.assertTrue('<legend>Este campo es obligatorio.</legend>' in html)
+            self.assertTrue('<p class="label">Este campo es obligatorio.</p>' in html)
+            self.assertEqual(len(translation.texts_cache), 2)
+
+            # Reloading the translations empties the cache
+            trans_real._translations = {}
+            self.assertEqual(translation.resolve(legend), u'Este campo es obligatorio.')
+            self.assertEqual(len(translation.texts_cache), 1)
+        finally:
+            trans_real._translations = translations
+            django_translation.deactivate()
+
+        # Other lazy values are output as Django does, resolved on every render
+        from django.utils.functional import lazy
+        from uni_form import compiler
+        renders = []
+        def get_value():
+            renders.append(None)
+            return u'value %d ' % len(renders)
+        function = compiler.compile_template(Template(u"{{ value }}{{ fieldset.legend }}"))
+        translation.clear_cache()
+        context = compiler.make_context({'value': lazy(get_value, unicode)(), 'fieldset': {'legend': legend}})
+        self.assertEqual(function(context), u'value 1 This field is required.')
+        self.assertEqual(function(context), u'value 2 This field is required.')
+        self.assertEqual(len(translation.texts_cache), 1)
+
+
+class TestViews(TestCase):
+    urls = 'uni_form.tests.urls'
+
+    def test_validate_fields(self):
+        response = self.client.post(reverse('validate_fields'), {
+            'email': '',
+            'first_name': 'Miguel',
+            'password1': 'god',
+            'uni_form_fields': ['email', 'first_name'],
+        })
+        self.assertEqual(response['Content-Type'], 'application/json')
+        result = simplejson.loads(response.content)
+
+        self.assertEqual(sorted(result.keys()), ['email', 'first_name'])
+        self.assertFalse(result['email']['valid'])
+        self.assertEqual(result['email']['id'], 'id_email')
+        self.assertEqual(len(result['email']['errors']), 1)
+        self.assertTrue('class="ctrlHolder error' in result['email']['html'])
+        self.assertTrue(result['first_name']['valid'])
+        self.assertEqual(result['first_name']['errors'], [])
+        self.assertTrue('value="Miguel"' in result['first_name']['html'])
+
+    def test_choices_json(self):
+        response = self.client.get(reverse('remote_choices', args=['choice']), {'page': 3})
+        result = simplejson.loads(response.content)
+        self.assertEqual(len(result['results']), 20)
+        self.assertEqual(result['results'][0], {'value': '100', 'label': 'Option 100'})
+        self.assertFalse(result['more'])
+
+        response = self.client.get(reverse('remote_choices', args=['choice']), {'q': 'option 1'})
+        result = simplejson.loads(response.content)
+        self.assertEqual(len(result['results']), 31)
+        self.assertEqual(result['results'][1]['label'], 'Option 10')
+        self.assertFalse(result['more'])
+
+        response = self.client.get(reverse('remote_choices', args=['choice']), {'page': 1})
+        self.assertTrue(simplejson.loads(response.content)['more'])
+
+        for i in range(3):
+            Group.objects.create(name='group %s' % i)
+        response = self.client.get(reverse('remote_choices', args=['groups']), {'q': 'up 2'})
+        result = simplejson.loads(response.content)
+        self.assertEqual(result, {'results': [{'value': '3', 'label': 'group 2'}], 'more': False})
+
+        request = RequestFactory().get('/choices/typo/')
+        self.assertRaises(Http404, choices_json, request, RemoteChoicesForm, 'typo')
+
+    def test_remote_select(self):
+        for i in range(3):
+            Group.objects.create(name='group %s' % i)
+        form = RemoteChoicesForm({'choice': '7', 'groups': ['1', '3']})
+        self.assertTrue(form.is_valid())
+
+        rendered = []
+        self.assertNumQueries(1, lambda: rendered.append(as_uni_form(form)))
+        html = rendered.pop()
+        self.assertTrue('data-choices-url="/choices/choice/"' in html)
+        self.assertTrue('<option value="">---</option>' in html)
+        self.assertTrue('<option value="7" selected="selected">Option 7</option>' in html)
+        self.assertEqual(html.count('<option'), 4)
+        self.assertTrue('data-choices-url="/groups/"' in html)
+        self.assertTrue('<option value="3" selected="selected">group 2</option>' in html)
+
+        self.assertNumQueries(0, lambda: rendered.append(as_uni_form(RemoteChoicesForm())))
+        html = rendered.pop()
+        self.assertEqual(html.count('<option'), 1)
+
+        self.assertFalse(RemoteChoicesForm({'choice': '200'}).is_valid())
+
+        # Invalid values submitted for a queryset are left out
+        form = RemoteChoicesForm({'choice': 'abc', 'groups': ['abc', '1']})
+        self.assertFalse(form.is_valid())
+        html = as_uni_form(form)
+        self.assertTrue('<option value="1" selected="selected">group 0</option>' in html)
+        self.assertFalse('abc' in html.split('data-choices-url="/groups/"')[1])
+
+    def test_formset_window_response(self):
+        from django.forms.formsets import formset_factory
+        TestFormSet = formset_factory(TestForm, extra = 5)
+        form_helper = FormHelper()
+        form_helper.formset_window_size = 2
+        form_helper.add_layout(Layout(Fieldset('Company', 'is_company')))
+
+        response = formset_window_response(RequestFactory().get('/', {'start': '2'}), TestFormSet(), form_helper)
+        result = simplejson.loads(response.content)
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['initial'], 0)
+        self.assertEqual(result['next'], 4)
+        self.assertEqual(result['html'].count('<legend>Company</legend>'), 2)
+        self.assertTrue('name="form-3-email"' in result['html'])
+        self.assertFalse('name="form-4-email"' in result['html'])
+
+        response = formset_window_response(RequestFactory().get('/', {'start': '4'}), TestFormSet())
+        result = simplejson.loads(response.content)
+        self.assertEqual((result['total'], result['next']), (5, None))
+        self.assertTrue('name="form-4-email"' in result['html'])
+
+    def test_validate_fields_only_post(self):
+        response = self.client.get(reverse('validate_fields'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_fragments_response(self):
+        data = {
+            'email': 'miguel@example.com',
+            'password1': 'god',
+            'password2': 'wargame',
+            'first_name': 'Miguel',
+            'uni_form_error_ids': ['div_id_email'],
+        }
+        request = RequestFactory().post('/', data)
+        form_helper = FormHelper()
+        form_helper.form_error_title = 'ERRORS'
+
+        response = fragments_response(request, TestForm(request.POST), form_helper)
+        result = simplejson.loads(response.content)
+
+        self.assertFalse(result['valid'])
+        # last_name has errors now, email had them before, first_name hasn't changed
+        self.assertEqual(sorted(result['fragments'].keys()), ['div_id_email', 'div_id_last_name'])
+        self.assertTrue('class="ctrlHolder error' in result['fragments']['div_id_last_name'])
+        self.assertFalse('errorField' in result['fragments']['div_id_email'])
+        self.assertTrue(result['errors'].startswith('<div id="errorMsg">'))
+        self.assertTrue('<h3>ERRORS</h3>' in result['errors'])
+
+        data.update({'last_name': 'Araujo', 'password2': 'god'})
+        request = RequestFactory().post('/', data)
+        response = fragments_response(request, TestForm(request.POST), redirect_url='/thanks/')
+        result = simplejson.loads(response.content)
+        self.assertEqual(result, {'valid': True, 'redirect': '/thanks/'})
+
+    def test_fragments_response_multifield(self):
+        data = {'email': 'miguel@example.com', 'password1': 'god', 'password2': 'god', 'first_name': 'Miguel'}
+        request = RequestFactory().post('/', data)
+        form_helper = FormHelper()
+        form_helper.add_layout(Layout(Fieldset('', 'email'),
+            MultiField('Name', 'first_name', 'last_name', css_id='names')))
+
+        # Fields of a MultiField are patched through its container
+        result = simplejson.loads(fragments_response(request, TestForm(request.POST), form_helper).content)
+        self.assertEqual(result['fragments'].keys(), ['names'])
+        self.assertTrue(result['fragments']['names'].startswith('<div id="names" class="ctrlHolder error">'))
+        self.assertTrue('id="error_0_id_last_name"' in result['fragments']['names'])
+        self.assertTrue('name="first_name"' in result['fragments']['names'])
+
+        data.update({'last_name': 'Araujo', 'email': '', 'uni_form_error_ids': ['names']})
+        request = RequestFactory().post('/', data)
+        result = simplejson.loads(fragments_response(request, TestForm(request.POST), form_helper).content)
+        self.assertEqual(sorted(result['fragments'].keys()), ['div_id_email', 'names'])
+        self.assertFalse('errorField' in result['fragments']['names'])
+
+        # Without css_id the MultiField can't be patched
+        form_helper.add_layout(Layout(Fieldset('', 'email'), MultiField('Name', 'first_name', 'last_name')))
+        result = simplejson.loads(fragments_response(request, TestForm(request.POST), form_helper).content)
+        self.assertEqual(result, {'valid': False, 'submit': True})
+
+
+class TestWarmUp(TestCase):
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.template_dir, 'uni_form'))
+        self.old_template_dirs = settings.TEMPLATE_DIRS
+        settings.TEMPLATE_DIRS = (self.template_dir,)
+        settings.UNIFORM_CACHE_TEMPLATES = True
+        loader.clear_cache()
+
+    def tearDown(self):
+        settings.TEMPLATE_DIRS = self.old_template_dirs
+        del settings.UNIFORM_CACHE_TEMPLATES
+        loader.clear_cache()
+        shutil.rmtree(self.template_dir)
+        warmup._forms[:] = []
+
+    def override_template(self, template_name, source):
+        template_file = open(os.path.join(self.template_dir, template_name), 'w')
+        template_file.write(source)
+        template_file.close()
+
+    def test_warm_up(self):
+        rendered = []
+        class WarmUpForm(TestForm):
+            def __iter__(self):
+                rendered.append(self)
+                return super(WarmUpForm, self).__iter__()
+        warmup.register_form(WarmUpForm)
+
+        self.assertEqual(warmup.warm_up(), [])
+        for template_name in loader.UNIFORM_TEMPLATES:
+            self.assertTrue(('django', True, False, template_name) in loader._templates)
+        self.assertEqual(len(rendered), 1)
+
+        # Templates loaded with other settings aren't served from the cache
+        template = loader.get_template('uni_form/field.html')
+        settings.UNIFORM_COMPACT_WHITESPACE = True
+        try:
+            self.assertFalse(loader.get_template('uni_form/field.html') is template)
+        finally:
+            del settings.UNIFORM_COMPACT_WHITESPACE
+        self.assertTrue(loader.get_template('uni_form/field.html') is template)
+
+    def test_check_templates(self):
+        self.assertEqual(warmup.check_templates(), [])
+
+        self.override_template('uni_form/field.html', '<div>{{ field }}</div>')
+        self.override_template('uni_form/errors.html', '{% if form.errors %}')
+        problems = warmup.check_templates()
+        self.assertEqual(len(problems), 2)
+        self.assertTrue("'uni_form/field.html'" in problems[0])
+        self.assertTrue('div_{{ field.auto_id }}' in problems[0])
+        self.assertTrue("'uni_form/errors.html' does not compile" in problems[1])
+
+        # Overrides writing the snippets their own way are fine
+        self.override_template('uni_form/field.html', '<div id="div_{{field.auto_id|default:""}}">{{ field }}</div>')
+        self.override_template('uni_form/errors.html', '<div id="errorMsg"></div>')
+        self.assertEqual(warmup.check_templates(), [])
+
+    def test_render_to_string(self):
+        self.override_template('uni_form/part.html', u"<i>{{ label }}</i>")
+        self.assertEqual(loader.render_to_string(['uni_form/missing.html', 'uni_form/part.html'], {'label': 'a'}),
+            u'<i>a</i>')
+        self.assertRaises(TemplateDoesNotExist, loader.render_to_string, ['uni_form/missing.html'])
+
+    def test_inline_includes(self):
+        self.override_template('uni_form/part.html', u"<i>{{ label }}</i>{% include 'uni_form/part.html' %}")
+        source = loader.inline_includes(u"""{% include "uni_form/part.html" with label="a" %}"""
+            u"""{% include 'uni_form/part.html' with label="b" only %}{% include "uni_form/missing.html" %}""")
+        self.assertEqual(source, u"""{% with label="a" %}<i>{{ label }}</i>{% include 'uni_form/part.html' %}{% endwith %}"""
+            u"""{% include 'uni_form/part.html' with label="b" only %}{% include "uni_form/missing.html" %}""")
+
+        # Templates failing to compile are rendered by the include, as nothing without TEMPLATE_DEBUG
+        self.override_template('uni_form/broken.html', u"{% if %}")
+        source = u"""<b>{% include "uni_form/broken.html" %}</b>"""
+        self.assertEqual(loader.inline_includes(source), source)
+
+        # The uni_form templates render the same with their includes inlined
+        from uni_form.tests import golden
+        outputs = []
+        try:
+            for inline in (False, True):
+                settings.UNIFORM_INLINE_INCLUDES = inline
+                loader.clear_cache()
+                outputs.append([golden.render_case(case)[0] for case in golden.CASES])
+        finally:
+            del settings.UNIFORM_INLINE_INCLUDES
+        self.assertEqual(outputs[0], outputs[1])
+        from django.template.loader_tags import ConstantIncludeNode
+        self.assertEqual(loader.get_template('uni_form/whole_uni_form.html').nodelist.get_nodes_by_type(
+            ConstantIncludeNode), [])
+
+    def test_inline_includes_loaders_without_source(self):
+        from django.template import loader as template_loader
+        old_loaders = settings.TEMPLATE_LOADERS
+        settings.TEMPLATE_LOADERS = tuple(old_loaders) + ('uni_form.tests.tests.CompiledOnlyLoader',)
+        template_loader.template_source_loaders = None
+        try:
+            # Templates whose source can't be found are loaded by Django's loaders
+            template = loader.get_template('uni_form/compiled_only.html')
+            self.assertEqual(template.render(Context({'label': 'a'})), u'<em>a</em>')
+            self.assertRaises(TemplateDoesNotExist, loader.get_template, 'uni_form/missing.html')
+        finally:
+            settings.TEMPLATE_LOADERS = old_loaders
+            template_loader.template_source_loaders = None
+
+    def test_compiled_overridden_templates(self):
+        from uni_form import compiler
+        from uni_form.renderers import CompiledRenderer
+        self.override_template('uni_form/field.html', u"""{% load uni_form_field %}
+            {% for error in field.errors %}<b>{{ forloop.counter }}{{ error|lower }}</b>{% empty %}<i></i>{% endfor %}
+            {% with field.label as label %}<div id="div_{{ field.auto_id }}">{{ label|default:"none" }}{{ field|with_class }}</div>{% endwith %}
+        """)
+        self.override_template('uni_form/errors.html', u"{% for error in form.non_field_errors %}<p class=\"{% cycle 'a' 'b' %}\">{{ error }}</p>{% endfor %}")
+
+        renderer = CompiledRenderer()
+        try:
+            renderer.prepare()
+            self.assertTrue(compiler.get_function('uni_form/field.html') is not None)
+            # Templates with tags the compiler doesn't support, inlined ones included, go
+            # through the template engine
+            uncompiled = compiler.compile_templates()
+            self.assertTrue('uni_form/errors.html' in uncompiled)
+            self.assertTrue('uni_form/whole_uni_form.html' in uncompiled)
+            self.assertFalse('uni_form/field.html' in uncompiled)
+
+            form = TestForm({'email': 'invalid', 'password1': 'a', 'password2': 'b'})
+            template = Template(u"{% load uni_form_tags %}{{ form|as_uni_form }}")
+            expected = template.render(Context({'form': form}))
+            settings.UNIFORM_RENDERER = renderer
+            try:
+                html = template.render(Context({'form': form}))
+            finally:
+                del settings.UNIFORM_RENDERER
+            self.assertEqual(html, expected)
+            self.assertTrue('<b>1this field is required.</b>' in html)
+            self.assertTrue('<p class="a">Passwords dont match</p>' in html)
+        finally:
+            compiler.clear_cache()
+
+    def test_compiled_include_errors(self):
+        from uni_form import compiler
+        self.override_template('uni_form/part.html', u"<i>{{ label }}</i>")
+
+        class Broken(object):
+            @property
+            def label(self):
+                raise ValueError
+
+        # Like IncludeNode, errors resolving the values of a dynamic include output nothing
+        template = Template(u"{% include name with label=broken.label %}<b></b>")
+        context = {'name': 'uni_form/part.html', 'broken': Broken()}
+        function = compiler.compile_template(template)
+        self.assertEqual(template.render(Context(context)), u'<b></b>')
+        self.assertEqual(function(compiler.make_context(context)), u'<b></b>')
+
+
+class TestWidgets(TestCase):
+    def setUp(self):
+        settings.UNIFORM_CACHE_CHOICES = True
+        choices_cache.clear()
+
+    def tearDown(self):
+        del settings.UNIFORM_CACHE_CHOICES
+        choices_cache.clear()
+
+    def test_cached_choices_same_html(self):
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {{ form|as_uni_form }}
+        """)
+        for form in (ChoicesForm(), ChoicesForm({'choice': '7', 'choices': ['b', 'c']})):
+            cached_html = template.render(Context({'form': form}))
+            self.assertEqual(len(choices_cache), 3)
+            del settings.UNIFORM_CACHE_CHOICES
+            html = template.render(Context({'form': form}))
+            settings.UNIFORM_CACHE_CHOICES = True
+            self.assertEqual(cached_html, html)
+
+        self.assertTrue('<option value="7" selected="selected">Option &lt;7&gt;</option>' in html)
+        self.assertTrue('<option value="b" selected="selected">B</option>' in html)
+
+    def test_cached_model_choices(self):
+        Group.objects.create(name='editors')
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {{ form|as_uni_form }}
+        """)
+        template.render(Context({'form': ChoicesForm()}))
+        self.assertNumQueries(0, lambda: template.render(Context({'form': ChoicesForm()})))
+
+        # Saving a group invalidates the options
+        Group.objects.create(name='writers')
+        html = template.render(Context({'form': ChoicesForm({'group': '2'})}))
+        self.assertTrue('<option value="2" selected="selected">writers</option>' in html)
+
+    def test_shared_formset_choices(self):
+        del settings.UNIFORM_CACHE_CHOICES
+        try:
+            Group.objects.create(name='editors')
+            Group.objects.create(name='writers')
+            from django.forms.formsets import formset_factory
+            ChoicesFormSet = formset_factory(ChoicesForm, extra=5)
+
+            template = get_template_from_string(u"""
+                {% load uni_form_tags %}
+                {% uni_form formset %}
+            """)
+            formset = ChoicesFormSet()
+            self.assertNumQueries(1, lambda: template.render(Context({'formset': formset})))
+            shared_html = template.render(Context({'formset': ChoicesFormSet()}))
+            self.assertTrue(formset.forms[0].fields['group'].widget.choices is formset.forms[4].fields['group'].widget.choices)
+            self.assertTrue(formset.forms[0].fields['choice'].widget.choices is formset.forms[4].fields['choice'].widget.choices)
+
+            template_filter = get_template_from_string(u"""
+                {% load uni_form_tags %}
+                {{ formset|as_uni_form }}
+            """)
+            data = {'form-TOTAL_FORMS': '2', 'form-INITIAL_FORMS': '0', 'form-1-group': '2', 'form-1-choice': '3'}
+            shared_filter_html = template_filter.render(Context({'formset': ChoicesFormSet(data)}))
+
+            settings.UNIFORM_SHARE_FORMSET_CHOICES = False
+            try:
+                formset = ChoicesFormSet()
+                self.assertNumQueries(5, lambda: template.render(Context({'formset': formset})))
+                html = template.render(Context({'formset': ChoicesFormSet()}))
+                filter_html = template_filter.render(Context({'formset': ChoicesFormSet(data)}))
+            finally:
+                del settings.UNIFORM_SHARE_FORMSET_CHOICES
+
+            self.assertEqual(shared_html, html)
+            self.assertEqual(shared_filter_html, filter_html)
+            self.assertTrue('<option value="2" selected="selected">writers</option>' in filter_html)
+        finally:
+            settings.UNIFORM_CACHE_CHOICES = True
+
+    def test_cached_widgets(self):
+        from django.utils import translation as django_translation
+
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {{ form|as_uni_form }}
+        """)
+        widgets_cache.clear()
+        forms = (TestForm(), TestForm(prefix='other'), TestForm(initial={'email': 'me@example.com'}),
+            TestForm({'email': 'you@example.com'}))
+        for form in forms:
+            cached_html = template.render(Context({'form': form}))
+            settings.UNIFORM_CACHE_WIDGETS = False
+            try:
+                html = template.render(Context({'form': form}))
+            finally:
+                del settings.UNIFORM_CACHE_WIDGETS
+            self.assertEqual(cached_html, html)
+
+        # Fields with a value and bound forms aren't cached
+        self.assertEqual(len(widgets_cache), 12)
+        self.assertTrue('value="me@example.com"' in template.render(Context({'form': forms[2]})))
+        self.assertTrue('name="other-email"' in template.render(Context({'form': forms[1]})))
+
+        # Widgets are cached per language, as their attributes may be lazy translations
+        django_translation.activate('es')
+        try:
+            template.render(Context({'form': forms[0]}))
+        finally:
+            django_translation.deactivate()
+        self.assertEqual(len(widgets_cache), 18)
+
+        # Input types set on the widget instance aren't mixed up
+        form = TestForm()
+        form.fields['email'].widget.input_type = 'email'
+        self.assertTrue('type="email"' in template.render(Context({'form': form})))
+        widgets_cache.clear()
+
+
+class TestProfiling(TestCase):
+    def test_render_profiling_middleware(self):
+        from uni_form.middleware import RenderProfilingMiddleware
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.http import HttpResponse
+
+        settings.UNIFORM_PROFILING = False
+        self.assertRaises(MiddlewareNotUsed, RenderProfilingMiddleware)
+        settings.UNIFORM_PROFILING = True
+        middleware = RenderProfilingMiddleware()
+        del settings.UNIFORM_PROFILING
+
+        form_helper = FormHelper()
+        form_helper.add_layout(Layout(Fieldset('Company', 'is_company')))
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+            {{ choices_form|as_uni_form }}
+        """)
+        Group.objects.create(name='editors')
+
+        request = RequestFactory().get('/')
+        middleware.process_request(request)
+        html = template.render(Context({'form': TestForm(), 'form_helper': form_helper, 'choices_form': ChoicesForm()}))
+        response = middleware.process_response(request, HttpResponse(u'<html><body>%s</body></html>' % html))
+
+        self.assertEqual(response['X-UniForm-Profile'].split(';')[:2], ['renders=2', ' queries=1'])
+        comment = response.content.split('<!-- uni_form renders:\n')[1]
+        self.assertTrue(comment.endswith('-->\n</body></html>'))
+        lines = comment.splitlines()
+        self.assertTrue(lines[0].strip().startswith('TestForm helper=FormHelper layout=yes fields=%d ' % len(TestForm.base_fields)))
+        self.assertTrue('render_to_string=%d' % len(TestForm.base_fields) in lines[0])
+        self.assertTrue(lines[1].strip().startswith('ChoicesForm helper=None layout=no fields=3 '))
+        self.assertTrue('queries=1' in lines[1])
+
+        # Nothing is recorded outside of requests going through the middleware
+        self.assertFalse(profiling.is_recording())
+        response = middleware.process_response(request, HttpResponse(u'<html><body></body></html>'))
+        self.assertFalse(response.has_header('X-UniForm-Profile'))
+
+    def test_render_metrics(self):
+        from uni_form import metrics
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+        """)
+        c = Context({'form': TestForm(), 'form_helper': FormHelper()})
+        template.render(c)
+        self.assertEqual(metrics.get_metrics(), {})
+
+        settings.UNIFORM_METRICS = True
+        metrics.reset()
+        try:
+            template.render(c)
+            template.render(c)
+            as_uni_form(TestForm())
+        finally:
+            del settings.UNIFORM_METRICS
+
+        render_metrics = metrics.get_metrics()
+        form_class = 'uni_form.tests.tests.TestForm'
+        self.assertEqual(sorted(render_metrics.keys()), [(form_class, None), (form_class, 'uni_form.helpers.FormHelper')])
+        helper_metrics = render_metrics[(form_class, 'uni_form.helpers.FormHelper')]
+        self.assertEqual(helper_metrics.count, 2)
+        self.assertEqual(helper_metrics.fields, len(TestForm.base_fields))
+        self.assertEqual(helper_metrics.buckets[-1], 2)
+        self.assertTrue(helper_metrics.size > 0)
+
+        text = metrics.export_text()
+        self.assertTrue('# TYPE uni_form_render_seconds histogram' in text)
+        self.assertTrue('uni_form_render_seconds_bucket{form="uni_form.tests.tests.TestForm",helper="uni_form.helpers.FormHelper",le="+Inf"} 2\n' in text)
+        self.assertTrue('uni_form_render_seconds_count{form="uni_form.tests.tests.TestForm",helper=""} 1\n' in text)
+        self.assertTrue('uni_form_render_bytes_total{form="uni_form.tests.tests.TestForm",helper="uni_form.helpers.FormHelper"} %d\n' % helper_metrics.size in text)
+
+        response = self.client.get(reverse('uni_form_metrics'))
+        self.assertEqual(response.content, text)
+        metrics.reset()
+
+    def test_render_budget(self):
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form form form_helper %}
+        """)
+        form_helper = FormHelper()
+        form_helper.render_budget_size = 1
+        html = template.render(Context({'form': TestForm({}), 'form_helper': form_helper}))
+
+        # The first field is rendered through its template, the ones left plainly
+        self.assertEqual(html.count('<div id="div_id_'), len(TestForm.base_fields))
+        self.assertTrue('<label for="id_is_company" >' in html)
+        self.assertTrue('<div id="div_id_email" class="ctrlHolder error"><p class="errorField">This field is required.</p>'
+            '<label for="id_email">email</label><input' in html)
+
+        form_helper.render_budget_size = None
+        form_helper.formset_window_url = 'simpleAction'
+        from django.forms.formsets import formset_factory
+        TestFormSet = formset_factory(TestForm, extra = 5)
+        template = get_template_from_string(u"""
+            {% load uni_form_tags %}
+            {% uni_form formset form_helper %}
+        """)
+        settings.UNIFORM_RENDER_BUDGET = 0
+        settings.UNIFORM_METRICS = True
+        try:
+            html = template.render(Context({'formset': TestFormSet(), 'form_helper': form_helper}))
+        finally:
+            del settings.UNIFORM_RENDER_BUDGET
+            del settings.UNIFORM_METRICS
+
+        # Formsets stop rendering forms, leaving the rest to be loaded like a window
+        self.assertTrue('name="form-0-email"' in html)
+        self.assertFalse('name="form-1-email"' in html)
+        self.assertTrue('<input type="hidden" name="form-TOTAL_FORMS" value="1" id="id_form-TOTAL_FORMS" />' in html)
+        self.assertTrue('data-window-url="%s" data-window-start="1"' % reverse('simpleAction') in html)
+
+        from uni_form import metrics
+        render_metrics = metrics.get_metrics()
+        metrics.reset()
+        self.assertEqual(render_metrics[('django.forms.formsets.TestFormFormSet', 'uni_form.helpers.FormHelper')].degraded, 1)
+
+        # Without a window url there's no loading them, the forms left are rendered plainly
+        form_helper.formset_window_url = ''
+        settings.UNIFORM_RENDER_BUDGET = 0
+        try:
+            html = template.render(Context({'formset': TestFormSet(), 'form_helper': form_helper}))
+        finally:
+            del settings.UNIFORM_RENDER_BUDGET
+        self.assertTrue('name="form-4-email"' in html)
+        self.assertTrue('<input type="hidden" name="form-TOTAL_FORMS" value="5" id="id_form-TOTAL_FORMS" />' in html)
+
+    def test_nested_render_budgets(self):
+        from uni_form import budget
+        outer = budget.RenderBudget(1)
+        previous = budget.activate(outer)
+        inner_previous = budget.activate(None)
+        self.assertTrue(inner_previous is outer)
+        budget.deactivate(inner_previous)
+        self.assertTrue(budget.get_active() is outer)
+        budget.deactivate(previous)
+        self.assertTrue(budget.get_active() is None)
+
+    def test_memory_benchmarks(self):
+        from uni_form.tests import benchmarks
+        stream = StringIO()
+        results = benchmarks.run(fields=12, forms_count=2, stream=stream)
+        self.assertEqual([name for name, result in results], ['as_uni_form', 'uni_form layout', 'formset helper'])
+        self.assertTrue(all([result['size'] > 0 for name, result in results]))
+        self.assertTrue(stream.getvalue().startswith(benchmarks.tracemalloc and 'as_uni_form: ' or 'tracemalloc is not available'))
+        if benchmarks.tracemalloc is not None:
+            layout = dict(results)['uni_form layout']['layout']
+            self.assertEqual(layout['Fieldset']['calls'], 1)
+            self.assertEqual(layout['field']['calls'], 12)
+            self.assertTrue(dict(results)['formset helper']['peak'] > 0)
+
+        # The layout objects are left untouched
+        self.assertFalse('traced' in repr(Fieldset.render))
+
+        results = benchmarks.compare_renderers(fields=4, forms_count=1)
+        self.assertEqual([renderer for renderer, result in results], list(benchmarks.RENDERERS))
+        self.assertFalse(hasattr(settings, 'UNIFORM_RENDERER'))
+
+
+class TestGoldenOutput(TestCase):
+    def test_golden_output(self):
+        from uni_form.tests import golden
+        baselines = golden.read_baselines()
+        problems = []
+        for case in golden.CASES:
+            problems.extend(golden.check_case(case, baselines))
+        self.assertEqual(problems, [])
+
+    @unittest.skipIf(jinja2 is None, "Jinja2 isn't installed")
+    def test_jinja2_golden_output(self):
+        from uni_form.tests import golden
+        settings.UNIFORM_TEMPLATE_ENGINE = 'jinja2'
+        try:
+            for name, source, get_context in golden.CASES:
+                html, counts = golden.render_case((name, source, get_context))
+                self.assertEqual(golden.normalize(html), golden.normalize(golden.read_golden(name)), name)
+            self.assertTrue(('jinja2', True, False, 'uni_form/field.html') in loader._templates)
+        finally:
+            del settings.UNIFORM_TEMPLATE_ENGINE
+            loader.clear_cache()
+
+    def test_python_renderer_golden_output(self):
+        from uni_form.tests import golden
+        settings.UNIFORM_RENDERER = 'uni_form.renderers.PythonRenderer'
+        try:
+            for name, source, get_context in golden.CASES:
+                html, counts = golden.render_case((name, source, get_context))
+                self.assertEqual(golden.normalize(html), golden.normalize(golden.read_golden(name)), name)
+                # Fields are rendered without templates
+                self.assertEqual(counts['render_to_string'], 0, name)
+        finally:
+            del settings.UNIFORM_RENDERER
+
+    def test_skeleton_renderer_golden_output(self):
+        from uni_form.tests import golden
+        from uni_form.renderers import SkeletonRenderer
+        renderer = SkeletonRenderer()
+        settings.UNIFORM_RENDERER = renderer
+        try:
+            for name, source, get_context in golden.CASES:
+                # Built on the first render, filled on the second
+                for run in range(2):
+                    html, counts = golden.render_case((name, source, get_context))
+                    self.assertEqual(golden.normalize(html), golden.normalize(golden.read_golden(name)), name)
+        finally:
+            del settings.UNIFORM_RENDERER
+
+        skeletons = renderer.skeletons.data.values()
+        self.assertTrue([entry for entry in skeletons if entry[0] is not None and entry[0].slots])
+        # Selects and other widgets are not split in slots
+        self.assertFalse([key for key in renderer.skeletons.data.keys() if key[3] == 'select'])
+
+        # Values are escaped and checkboxes checked like the widgets do
+        from uni_form.tests.golden import WidgetsForm, normalize
+        template = Template(u"{% load uni_form_tags %}{{ form|as_uni_form }}")
+        initial = {'text': u'<"a" & b>', 'notes': u'</textarea>', 'agree': True, 'hidden': u'h"'}
+        expected = normalize(template.render(Context({'form': WidgetsForm(initial=initial)})))
+        settings.UNIFORM_RENDERER = renderer
+        try:
+            for run in range(2):
+                html = template.render(Context({'form': WidgetsForm(initial=initial)}))
+                self.assertEqual(normalize(html), expected)
+            self.assertTrue('checked="checked"' in html)
+            self.assertTrue('&lt;/textarea&gt;</textarea>' in html)
+
+            # Input types set on the widget instance aren't mixed up
+            form = WidgetsForm(initial=initial)
+            form.fields['email'].widget.input_type = 'email'
+            self.assertFalse('type="email"' in template.render(Context({'form': WidgetsForm(initial=initial)})))
+            self.assertTrue('type="email"' in template.render(Context({'form': form})))
+        finally:
+            del settings.UNIFORM_RENDERER
+
+    def test_compiled_renderer_golden_output(self):
+        from uni_form import compiler
+        from uni_form.tests import golden
+        settings.UNIFORM_RENDERER = 'uni_form.renderers.CompiledRenderer'
+        try:
+            for name, source, get_context in golden.CASES:
+                html, counts = golden.render_case((name, source, get_context))
+                self.assertEqual(golden.normalize(html), golden.normalize(golden.read_golden(name)), name)
+            # Every shipped template compiles
+            self.assertEqual(compiler.compile_templates(), [])
+        finally:
+            del settings.UNIFORM_RENDERER
+            compiler.clear_cache()
+
+    def test_compact_whitespace_golden_output(self):
+        from uni_form.tests import golden
+        engines = ['django']
+        if jinja2 is not None:
+            from uni_form import jinja
+            engines.append('jinja2')
+        sizes = []
+        settings.UNIFORM_COMPACT_WHITESPACE = True
+        try:
+            for engine in engines:
+                settings.UNIFORM_TEMPLATE_ENGINE = engine
+                if engine == 'jinja2':
+                    jinja._environment = None
+                for name, source, get_context in golden.CASES:
+                    html, counts = golden.render_case((name, source, get_context))
+                    self.assertEqual(golden.normalize(html), golden.normalize(golden.read_golden(name)), name)
+                    if engine == 'django':
+                        sizes.append((len(html), len(golden.read_golden(name))))
+        finally:
+            del settings.UNIFORM_COMPACT_WHITESPACE
+            del settings.UNIFORM_TEMPLATE_ENGINE
+            if jinja2 is not None:
+                jinja._environment = None
+            loader.clear_cache()
+
+        self.assertTrue(sum([compact for compact, full in sizes]) < sum([full for compact, full in sizes]) * 0.8)
+
+    def test_compact_whitespace(self):
+        source = (u"{% if a %}\n  <div>\n    <pre>  {{ a }}\n  b  </pre>\n    <TEXTAREA>\n x </TEXTAREA>\n"
+            u"    {{ b }}\n    <span>\n {% endif %}\n  </span>\n  <input\n    name=\"x\"\n  />\n</div>\n"
+            u"<script>// a\n  b();</script>\n<style>\n  p {}\n</style>")
+        self.assertEqual(loader.compact_whitespace(source), u"{% if a %} <div> <pre>  {{ a }}\n  b  </pre> "
+            u"<TEXTAREA>\n x </TEXTAREA> {{ b }} <span> {% endif %} </span> <input name=\"x\" /> </div> "
+            u"<script>// a\n  b();</script> <style>\n  p {}\n</style>")
@@ -1,5 +1,11 @@
 from django.conf.urls.defaults import *
 
+from uni_form.tests.tests import TestForm, RemoteChoicesForm
+
 urlpatterns = patterns('',
     url(r'^simple/action/$', 'simpleAction', name = 'simpleAction'),
+    url(r'^validate/$', 'uni_form.views.validate_fields', {'form_class': TestForm}, name = 'validate_fields'),
+    url(r'^choices/(?P<field_name>\w+)/$', 'uni_form.views.choices_json', {'form_class': RemoteChoicesForm,
+        'search_fields': ('name',)}, name = 'remote_choices'),
+    url(r'^metrics/$', 'uni_form.views.metrics', name = 'uni_form_metrics'),
 )
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+    Resolution of the lazy translations uni_form outputs, like the labels and
+    help texts of fields, the legends of fieldsets and the error titles. Every
+    lazy translation is resolved once per language and kept in a cache of
+    `UNIFORM_TRANSLATION_CACHE_SIZE` entries, instead of being resolved on every
+    render. Only those texts go through `resolve`, other variables are output as
+    Django does.
+
+    Django loads the translation catalogs once per process. The cache is emptied
+    when they are replaced, like tests do by resetting `trans_real._translations`,
+    but code reloading them in place has to call `clear_cache` itself.
+
+    Any lazy object given as one of those texts is cached the same way, not only
+    `ugettext_lazy` ones, so a lazy text depending on something else than the
+    language is resolved once per language too.
+
+"""
+from django.conf import settings
+from django.utils.encoding import force_unicode
+from django.utils.functional import Promise
+from django.utils.translation import get_language, trans_real
+
+from uni_form.cache import LRUCache
+
+texts_cache = LRUCache(getattr(settings, 'UNIFORM_TRANSLATION_CACHE_SIZE', 1000))
+
+# The translations the cached texts were resolved with
+_translations = None
+
+
+def resolve(text):
+    """
+    Returns `text` resolved in the active language if it's a lazy object, and as
+    is otherwise. The resolved value is cached per language.
+    """
+    if not isinstance(text, Promise):
+        return text
+
+    global _translations
+    if trans_real._translations is not _translations:
+        texts_cache.clear()
+        _translations = trans_real._translations
+
+    key = (id(text), get_language())
+    entry = texts_cache.get(key)
+    # Ids are reused once lazy translations are garbage collected
+    if entry is None or entry[0] is not text:
+        entry = (text, force_unicode(text))
+        texts_cache.set(key, entry)
+    return entry[1]
+
+
+def clear_cache():
+    """
+    Empties the cache, to call after reloading Django's translations.
+    """
+    texts_cache.clear()
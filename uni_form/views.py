@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+    Views and responses for doing form validation and rendering through AJAX 
+    calls from uni-form.jquery.js, without full page POSTs and re-renders.
+
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.forms.formsets import TOTAL_FORM_COUNT, INITIAL_FORM_COUNT
+from django.forms.models import ModelChoiceIterator
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils import simplejson
+from django.utils.encoding import force_unicode
+
+from uni_form import metrics as render_metrics
+from uni_form.helpers import get_formset_window, render_field_fragments
+from uni_form.loader import render_to_string
+from uni_form.widgets import flatten_choices, share_choices
+
+
+def validate_fields(request, form_class, form_kwargs=None, template="uni_form/field.html"):
+    """
+    Validates some of the fields of `form_class` against the POSTed data and returns
+    a JSON object keyed by the html name of every field validated, holding its `id`,
+    whether it is `valid`, its `errors` and its `html` rendered with `template`.
+
+    The fields to validate are the ones listed in the `uni_form_fields` POST parameter.
+    Hook it into your urlconf passing your form class::
+
+        url(r'^contact/validate/$', 'uni_form.views.validate_fields', {'form_class': ContactForm}),
+
+    `form_kwargs` are extra keyword arguments for instantiating the form, like `prefix`.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    form = form_class(request.POST, request.FILES, **(form_kwargs or {}))
+    field_names = request.POST.getlist('uni_form_fields')
+
+    # Triggers the whole form validation, but only the requested fields are reported
+    form.errors
+
+    response = {}
+    for bound_field in form:
+        if bound_field.html_name not in field_names:
+            continue
+
+        response[bound_field.html_name] = {
+            'id': bound_field.auto_id,
+            'valid': not bound_field.errors,
+            'errors': [force_unicode(error) for error in bound_field.errors],
+            'html': render_to_string(template, {'field': bound_field}),
+        }
+
+    return HttpResponse(simplejson.dumps(response), mimetype='application/json')
+
+
+def fragments_response(request, form, helper=None, redirect_url=None):
+    """
+    Returns the JSON response uni-form.jquery.js expects when submitting a form with
+    the `fragment_submit` option. Instead of the whole form it holds `valid`, the 
+    `fragments` of the fields whose html changed keyed by their `div_<auto_id>` id, 
+    the non field `errors` block and, for valid forms, the url to `redirect` to.
+    Fields of a `MultiField` of the `helper` layout are patched through its whole 
+    container, and when it has no `css_id` the response asks to `submit` the form 
+    without AJAX instead.
+
+    Use it from your own view when the request comes through AJAX::
+
+        if request.is_ajax():
+            return fragments_response(request, form, helper, redirect_url=reverse('thanks'))
+    """
+    response = {'valid': form.is_valid()}
+    if response['valid']:
+        response['redirect'] = redirect_url
+    else:
+        form_error_title = helper and helper.get_attributes().get('form_error_title')
+        fragments = render_field_fragments(form, request.POST.getlist('uni_form_error_ids'),
+            layout=helper and helper.layout)
+        if fragments is None:
+            return HttpResponse(simplejson.dumps({'valid': False, 'submit': True}), mimetype='application/json')
+        response['fragments'] = fragments
+        response['errors'] = render_to_string('uni_form/errors.html', {
+            'form': form, 'form_error_title': form_error_title,
+        }).strip()
+
+    return HttpResponse(simplejson.dumps(response), mimetype='application/json')
+
+
+def choices_json(request, form_class, field_name, form_kwargs=None, search_fields=None, page_size=50):
+    """
+    Returns a page of the choices of the field `field_name` of `form_class`, for the
+    `RemoteSelect` widgets. The page number comes in the `page` GET parameter and the
+    optional search term in `q`. The response is a JSON object with a list of `results`,
+    each one holding a `value` and a `label`, and whether there are `more` pages.
+
+    Choices coming from a queryset are searched in its `search_fields` through the 
+    database, or through their labels otherwise, which means iterating all of them::
+
+        url(r'^product/choices/$', 'uni_form.views.choices_json', {'form_class': OrderForm,
+            'field_name': 'product', 'search_fields': ('name', 'code')}, name='product_choices'),
+    """
+    form = form_class(**(form_kwargs or {}))
+    try:
+        field = form.fields[field_name]
+    except KeyError:
+        raise Http404("Form has no field '%s'" % field_name)
+
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    term = request.GET.get('q', '').strip().lower()
+    start = (page - 1) * page_size
+
+    queryset = getattr(field, 'queryset', None)
+    if queryset is not None and (search_fields or not term):
+        if term:
+            query = Q()
+            for search_field in search_fields:
+                query |= Q(**{'%s__icontains' % search_field: term})
+            queryset = queryset.filter(query)
+        choice = ModelChoiceIterator(field).choice
+        choices = [choice(obj) for obj in queryset[start:start + page_size + 1]]
+    else:
+        if queryset is not None:
+            choices = [choice for choice in ModelChoiceIterator(field) if choice[0] != u'']
+        else:
+            choices = [choice for choice in flatten_choices(field.choices) if choice[0] != '']
+        if term:
+            choices = [(value, label) for value, label in choices if term in force_unicode(label).lower()]
+        choices = choices[start:start + page_size + 1]
+
+    response = {
+        'results': [{'value': force_unicode(value), 'label': force_unicode(label)}
+            for value, label in choices[:page_size]],
+        'more': len(choices) > page_size,
+    }
+    return HttpResponse(simplejson.dumps(response), mimetype='application/json')
+
+
+def formset_window_response(request, formset, helper=None, size=50):
+    """
+    Returns the JSON response uni-form.jquery.js expects when loading the next window
+    of a formset rendered with the `formset_window_size` helper attribute. The window
+    starts at the `start` GET parameter and holds `helper.formset_window_size` forms, 
+    or `size` without a helper. The response holds their `html`, the `total` and 
+    `initial` form counts for the management form and where the `next` window starts.
+
+    Use it from the view serving the helper's `formset_window_url`, building the 
+    formset like the page does::
+
+        def inventory_window(request):
+            formset = InventoryFormSet(queryset=Item.objects.all())
+            return formset_window_response(request, formset, InventoryFormSet.helper)
+    """
+    try:
+        start = int(request.GET.get('start', 0))
+    except ValueError:
+        start = 0
+    size = getattr(helper, 'formset_window_size', None) or size
+
+    forms, management_form, next_start = get_formset_window(formset, start, size)
+    if getattr(settings, 'UNIFORM_SHARE_FORMSET_CHOICES', True):
+        share_choices(forms)
+
+    form_error_title = None
+    if helper is not None:
+        attrs = helper.get_attributes()
+        form_error_title = attrs.get('form_error_title')
+        if helper.layout:
+            for form in forms:
+                form.form_html = helper.render_layout(form, attrs['form_style'])
+
+    response = {
+        'html': render_to_string('uni_form/formset_forms.html', {
+            'formset': formset, 'formset_forms': forms, 'form_error_title': form_error_title,
+        }),
+        'total': management_form.initial[TOTAL_FORM_COUNT],
+        'initial': management_form.initial[INITIAL_FORM_COUNT],
+        'next': next_start,
+    }
+    return HttpResponse(simplejson.dumps(response), mimetype='application/json')
+
+
+def metrics(request):
+    """
+    Serves the aggregated render metrics of this process in the Prometheus text 
+    format, for scrapers. Protect its url like any other internal one.
+    """
+    return HttpResponse(render_metrics.export_text(), mimetype='text/plain; version=0.0.4; charset=utf-8')
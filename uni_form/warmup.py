@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+    Warming up of uni_form, so the first requests served by a process don't pay
+    for importing the template tags, loading and compiling the templates or
+    anything a first render of a form does.
+
+    Call `warm_up` once at startup, for example from your wsgi script::
+
+        from uni_form.warmup import warm_up
+        warm_up()
+
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.base import get_library
+from django.utils.importlib import import_module
+
+from uni_form import renderers
+from uni_form.loader import UNIFORM_TEMPLATES, find_template_source, get_template, is_overridden
+
+# Snippets overridden templates need for everything in uni_form to work, and the
+# patterns matching the ways they can be written
+REQUIRED_SNIPPETS = {
+    'uni_form/field.html': (('div_{{ field.auto_id }}', re.compile(r'div_\{\{\s*field\.auto_id\b')),),
+    'uni_form/errors.html': (('errorMsg', re.compile(r'errorMsg')),),
+}
+
+_forms = []
+
+
+def register_form(form_class, helper=None):
+    """
+    Registers a form or formset class to be rendered once by `warm_up`, with `helper`
+    or with its `helper` attribute if it has one.
+    """
+    _forms.append((form_class, helper))
+
+
+def get_registered_forms():
+    """
+    Returns the forms registered through `register_form` and the ones listed by
+    dotted path in the `UNIFORM_WARMUP_FORMS` setting.
+    """
+    forms = list(_forms)
+    for path in getattr(settings, 'UNIFORM_WARMUP_FORMS', ()):
+        module_name, class_name = path.rsplit('.', 1)
+        try:
+            forms.append((getattr(import_module(module_name), class_name), None))
+        except (ImportError, AttributeError), e:
+            raise ImproperlyConfigured("Could not import form '%s' in UNIFORM_WARMUP_FORMS: %s" % (path, e))
+    return forms
+
+
+def check_templates():
+    """
+    Returns a list of problems found with the uni_form templates, including the
+    ones overridden by the project: templates that can't be loaded or compiled and
+    overrides lacking markup uni_form relies on.
+    """
+    problems = []
+    for template_name in UNIFORM_TEMPLATES:
+        try:
+            source, origin = find_template_source(template_name)
+            Template(source, name=template_name)
+        except TemplateDoesNotExist:
+            problems.append("Template '%s' could not be found" % template_name)
+            continue
+        except TemplateSyntaxError, e:
+            problems.append("Template '%s' does not compile: %s" % (template_name, e))
+            continue
+
+        if is_overridden(origin):
+            for snippet, pattern in REQUIRED_SNIPPETS.get(template_name, ()):
+                if not pattern.search(source):
+                    problems.append("Template '%s' overridden in %s lacks '%s'" % (template_name, origin, snippet))
+
+    return problems
+
+
+def warm_up(render_forms=True):
+    """
+    Imports the uni_form template tags, loads and compiles every uni_form template,
+    prepares the renderer set by the `UNIFORM_RENDERER` setting, logs the problems
+    found by `check_templates` and, if `render_forms`, renders once every registered
+    form. Returns the problems found.
+    """
+    get_library('uni_form_tags')
+
+    problems = check_templates()
+    for problem in problems:
+        logging.warning(problem)
+
+    for template_name in UNIFORM_TEMPLATES:
+        try:
+            get_template(template_name)
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            pass
+    renderers.get_renderer().prepare()
+
+    if render_forms:
+        with_helper = Template(u"{% load uni_form_tags %}{% uni_form form helper %}")
+        without_helper = Template(u"{% load uni_form_tags %}{% uni_form form %}")
+        for form_class, helper in get_registered_forms():
+            form = form_class()
+            helper = helper or getattr(form, 'helper', None)
+            if helper is None:
+                without_helper.render(Context({'form': form}))
+            else:
+                with_helper.render(Context({'form': form, 'helper': helper}))
+
+    return problems
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+    Faster rendering of widgets that are expensive to render.
+
+    With the `UNIFORM_CACHE_CHOICES` setting on, the options of `Select` and
+    `SelectMultiple` widgets are rendered once and kept in a cache keyed by their
+    choices, so every render only marks the selected ones. Choices coming from a
+    queryset are keyed by its SQL, so cached options save the query too, and are
+    invalidated whenever an instance of its model is saved or deleted.
+
+    Forms of a formset share the choices their fields have in common, so they are
+    evaluated and rendered once per render.
+
+    Fields with too many choices for rendering them at all can use the `RemoteSelect`
+    widgets, which uni-form.jquery.js fills page by page from a `choices_json` view.
+
+    The widgets of unbound fields without an initial value, which render the same
+    every time, are rendered once and kept in a cache unless the `UNIFORM_CACHE_WIDGETS`
+    setting is off.
+
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import ModelChoiceIterator
+from django.forms.util import flatatt
+from django.forms.widgets import CheckboxInput, FileInput, HiddenInput, PasswordInput, Select, SelectMultiple
+from django.forms.widgets import Textarea, TextInput
+from django.utils.encoding import force_unicode
+from django.utils.functional import Promise
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from uni_form.cache import LRUCache
+
+choices_cache = LRUCache(getattr(settings, 'UNIFORM_CHOICES_CACHE_SIZE', 100))
+widgets_cache = LRUCache(getattr(settings, 'UNIFORM_WIDGETS_CACHE_SIZE', 1000))
+
+# Widgets whose render only depends on their attributes, name and value
+CACHED_WIDGETS = (TextInput, PasswordInput, HiddenInput, Textarea, CheckboxInput, FileInput)
+
+_invalidated_models = set()
+
+
+def freeze_choices(choices):
+    """
+    Turns static choices into a hashable tuple, resolving lazy labels.
+    """
+    frozen = []
+    for value, label in choices:
+        if isinstance(label, (list, tuple)):
+            label = freeze_choices(label)
+        elif isinstance(label, Promise):
+            label = force_unicode(label)
+        frozen.append((value, label))
+    return tuple(frozen)
+
+
+def get_choices_key(choices):
+    """
+    Returns the key identifying `choices` in the cache, or None if they can't be cached.
+    """
+    if isinstance(choices, ModelChoiceIterator):
+        field, queryset = choices.field, choices.queryset
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except Exception:
+            # Empty querysets and such, which don't run any query anyway
+            return None
+
+        return ('model', queryset.model, queryset.db, sql, tuple(params), type(field),
+            force_unicode(field.empty_label), field.to_field_name, get_language())
+
+    try:
+        return ('static', freeze_choices(choices))
+    except (TypeError, ValueError):
+        return None
+
+
+def invalidate_choices(sender, **kwargs):
+    """
+    Drops from the cache the options of choices coming from querysets of the `sender`
+    model. It's connected to `post_save` and `post_delete`, call it yourself after 
+    changes that don't send those, like `QuerySet.update`.
+    """
+    choices_cache.delete_matching(lambda key: key[0] == 'model' and key[1] is sender)
+
+
+def get_cached_options(widget):
+    key = get_choices_key(widget.choices)
+    if key is None:
+        return None
+
+    options = choices_cache.get(key)
+    if options is None:
+        options = widget.render_options((), ())
+        choices_cache.set(key, options)
+
+        model = key[0] == 'model' and key[1]
+        if model and model not in _invalidated_models:
+            _invalidated_models.add(model)
+            post_save.connect(invalidate_choices, sender=model, weak=False)
+            post_delete.connect(invalidate_choices, sender=model, weak=False)
+
+    return options
+
+
+def select_options(options, selected_choices):
+    """
+    Marks as selected the options in `options` whose values are in `selected_choices`,
+    the same way `Select.render_option` does.
+    """
+    for value in set([force_unicode(value) for value in selected_choices]):
+        option = u'<option value="%s">' % escape(value)
+        options = options.replace(option, u'<option value="%s" selected="selected">' % escape(value))
+    return options
+
+
+class SharedChoices(list):
+    """
+    Evaluated choices shared by the same field of several forms, which keeps their
+    options once rendered.
+    """
+    options = None
+
+
+def share_formset_choices(formset, extra_forms=()):
+    """
+    Evaluates only once the choices that the fields of the forms in `formset` have in
+    common, like `ModelChoiceField` querysets, and hands the same `SharedChoices` to 
+    all of them, so their options are rendered once too. `extra_forms`, like the
+    formset's `empty_form`, share them as well.
+    """
+    share_choices(list(formset.forms) + list(extra_forms))
+
+
+def share_choices(forms):
+    """
+    Shares the choices the fields of `forms` have in common, like `share_formset_choices`.
+    """
+    shared = {}
+    for form in forms:
+        for field in form.fields.values():
+            widget = field.widget
+            if not hasattr(widget, 'choices') or isinstance(widget.choices, SharedChoices):
+                continue
+
+            # Remote choices are never evaluated
+            if isinstance(widget, RemoteSelect):
+                continue
+
+            key = get_choices_key(widget.choices)
+            if key is None:
+                continue
+
+            if key not in shared:
+                shared[key] = SharedChoices(iter(widget.choices))
+            widget.choices = shared[key]
+
+
+def flatten_choices(choices):
+    """
+    Returns `choices` as a list of (value, label) tuples, leaving out optgroups.
+    """
+    flat = []
+    for value, label in choices:
+        if isinstance(label, (list, tuple)):
+            flat.extend(label)
+        else:
+            flat.append((value, label))
+    return flat
+
+
+class RemoteSelect(Select):
+    """
+    A `Select` that only renders its empty and selected options, for fields with too 
+    many choices. uni-form.jquery.js loads the rest from `url`, a `choices_json` view
+    or the name of its url, page by page as the user searches them. Validation is 
+    still done by the field.
+
+    Use it like any other widget::
+
+        product = forms.ModelChoiceField(queryset=Product.objects.all(),
+            widget=RemoteSelect(url='product_choices'))
+    """
+    def __init__(self, url, attrs=None, choices=()):
+        super(RemoteSelect, self).__init__(attrs, choices)
+        self.url = url
+
+    def get_url(self):
+        try:
+            return reverse(self.url)
+        except NoReverseMatch:
+            return self.url
+
+    def get_choices(self, values):
+        """
+        Returns the empty choice and the ones whose value is in `values`, without 
+        iterating all of them if they come from a queryset.
+        """
+        values = set([force_unicode(value) for value in values if value not in ('', None)])
+        if isinstance(self.choices, ModelChoiceIterator):
+            field = self.choices.field
+            choices = []
+            if field.empty_label is not None:
+                choices.append((u'', field.empty_label))
+            key = field.to_field_name or 'pk'
+            # Values submitted to invalid forms may not be valid keys, ModelMultipleChoiceField.clean checks them the same way
+            for value in list(values):
+                try:
+                    self.choices.queryset.filter(**{key: value})
+                except (ValueError, ValidationError):
+                    values.discard(value)
+            if values:
+                objects = self.choices.queryset.filter(**{'%s__in' % key: list(values)})
+                choices.extend([self.choices.choice(obj) for obj in objects])
+            return choices
+
+        return [(value, label) for value, label in flatten_choices(self.choices)
+            if value == '' or force_unicode(value) in values]
+
+    def render(self, name, value, attrs=None, choices=()):
+        if value is None:
+            value = ''
+        return self.render_remote(u'<select%s>', name, [value], attrs)
+
+    def render_remote(self, select, name, values, attrs):
+        final_attrs = self.build_attrs(attrs, name=name)
+        final_attrs['data-choices-url'] = self.get_url()
+        output = [select % flatatt(final_attrs)]
+        selected_choices = set([force_unicode(value) for value in values])
+        for option_value, option_label in self.get_choices(values):
+            output.append(self.render_option(selected_choices, option_value, option_label))
+        output.append(u'</select>')
+        return mark_safe(u'\n'.join(output))
+
+
+class RemoteSelectMultiple(RemoteSelect, SelectMultiple):
+    """
+    A `SelectMultiple` whose choices are loaded like `RemoteSelect` does.
+    """
+    def render(self, name, value, attrs=None, choices=()):
+        return self.render_remote(u'<select multiple="multiple"%s>', name, value or [], attrs)
+
+
+def get_select_options(widget):
+    """
+    Returns the already rendered options of `widget`, if they are shared or cached.
+    """
+    choices = widget.choices
+    if isinstance(choices, SharedChoices):
+        if choices.options is None:
+            choices.options = widget.render_options((), ())
+        return choices.options
+
+    if getattr(settings, 'UNIFORM_CACHE_CHOICES', False):
+        return get_cached_options(widget)
+
+    return None
+
+
+def render_cached_select(bound_field, attrs=None):
+    """
+    Renders `bound_field` like `BoundField.as_widget` does, with its options already 
+    rendered. Returns None if its widget isn't a `Select` or `SelectMultiple` or its
+    options are neither shared nor cached.
+    """
+    widget = bound_field.field.widget
+    if type(widget) not in (Select, SelectMultiple):
+        return None
+
+    options = get_select_options(widget)
+    if options is None:
+        return None
+
+    attrs = dict(attrs or {})
+    auto_id = bound_field.auto_id
+    if auto_id and 'id' not in attrs and 'id' not in widget.attrs:
+        attrs['id'] = auto_id
+    final_attrs = widget.build_attrs(attrs, name=bound_field.html_name)
+
+    value = bound_field.value()
+    if type(widget) is SelectMultiple:
+        output = [u'<select multiple="multiple"%s>' % flatatt(final_attrs)]
+        selected_choices = value or []
+    else:
+        output = [u'<select%s>' % flatatt(final_attrs)]
+        if value is None:
+            value = ''
+        selected_choices = [value]
+
+    options = select_options(options, selected_choices)
+    if options:
+        output.append(options)
+    output.append(u'</select>')
+    return mark_safe(u'\n'.join(output))
+
+
+def get_widget_key(bound_field, attrs):
+    """
+    Returns the key identifying the render of `bound_field`'s widget with `attrs` in
+    the cache, or None if it can't be cached: its form is bound, it has a value or its
+    widget isn't one of `CACHED_WIDGETS`.
+    """
+    widget = bound_field.field.widget
+    if type(widget) not in CACHED_WIDGETS or bound_field.form.is_bound:
+        return None
+
+    if bound_field.value() not in (None, ''):
+        return None
+
+    key = (type(widget), getattr(widget, 'input_type', None), tuple(sorted(widget.attrs.items())),
+        tuple(sorted(attrs.items())), bound_field.html_name, bound_field.auto_id,
+        getattr(widget, 'check_test', None), get_language())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def render_cached_widget(bound_field, attrs=None):
+    """
+    Renders `bound_field` like `BoundField.as_widget` does, once per widget class,
+    attributes, name and id if its form is unbound and it has no initial value.
+    Returns None if it can't be cached.
+    """
+    if not getattr(settings, 'UNIFORM_CACHE_WIDGETS', True):
+        return None
+
+    attrs = attrs or {}
+    key = get_widget_key(bound_field, attrs)
+    if key is None:
+        return None
+
+    html = widgets_cache.get(key)
+    if html is None:
+        html = bound_field.as_widget(attrs=dict(attrs))
+        widgets_cache.set(key, html)
+    return html